@@ -0,0 +1,217 @@
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+import numpy as np
+from corpus_reader import words_from_text, iter_words
+from ngram_profile import NgramProfile, cosine_distances
+from author_profile import AuthorProfile
+
+MAX_BATCH = 32 # most texts scored in one call
+MAX_DELAY = 0.010 # seconds to wait for more requests to fill a batch
+MAX_BODY = 50 * 1024 * 1024 # largest text accepted, in bytes
+RECENT = 1000 # number of latencies kept for the stats endpoint
+READ_TIMEOUT = 30.0 # seconds a client gets to send the headers, and then the body
+
+class AttributionModel():
+    """ Reference author profiles, loaded once and scored in batches """
+
+    # the reference n-gram counts are stacked into one matrix when the model
+    # is built, so scoring a batch of unknown texts is a single matrix product
+    def __init__(self, profiles_by_author):
+        self.authors = list(profiles_by_author)
+        self.char_counts = np.stack([profiles_by_author[author].ngrams.char_counts
+                                     for author in self.authors])
+        self.word_counts = np.stack([profiles_by_author[author].ngrams.word_counts
+                                     for author in self.authors])
+        # tokenize something now so nltk loads its models before the first request
+        words_from_text('Warm up the tokenizer.')
+
+    def rank(self, texts):
+        """ Return the authors ranked by similarity to each text """
+        profiles = [NgramProfile().add_words(words_from_text(text)) for text in texts]
+        char_distances = cosine_distances(np.stack([p.char_counts for p in profiles]),
+                                          self.char_counts)
+        word_distances = cosine_distances(np.stack([p.word_counts for p in profiles]),
+                                          self.word_counts)
+        rankings = []
+        for i, profile in enumerate(profiles):
+            # most similar (smallest character n-gram distance) first
+            order = np.argsort(char_distances[i])
+            rankings.append({'words': profile.num_words,
+                             'ranking': [{'author': self.authors[j],
+                                          'char_distance': float(char_distances[i, j]),
+                                          'word_distance': float(word_distances[i, j])}
+                                         for j in order]})
+        return rankings
+
+def load_profiles(references):
+    """ Return AuthorProfiles from a dictionary of author to .npz or text file """
+    profiles_by_author = dict()
+    for author, filename in references.items():
+        if filename.endswith('.npz'):
+            profiles_by_author[author] = AuthorProfile.load(filename)
+        else:
+            # only the n-grams are used here, so skip the slow POS tagging
+            profile = AuthorProfile(author, tag_pos=False)
+            profile.ngrams.add_words(iter_words(filename))
+            profiles_by_author[author] = profile
+    return profiles_by_author
+
+class AttributionServer():
+    """ Small asyncio HTTP server that batches attribution requests """
+
+    # requests are put on a queue and a single batcher task takes up to
+    # max_batch of them at a time, waiting at most max_delay for the batch to
+    # fill.  The batch is scored in a worker thread so the event loop keeps
+    # accepting connections while the numbers are crunched
+    def __init__(self, model, max_batch=MAX_BATCH, max_delay=MAX_DELAY,
+                 read_timeout=READ_TIMEOUT):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.read_timeout = read_timeout
+        self.queue = None
+        self.started = time.time()
+        self.requests = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.latencies = deque(maxlen=RECENT)
+
+    async def start(self, host='127.0.0.1', port=8000):
+        """ Start listening and batching, return the asyncio server """
+        self.queue = asyncio.Queue()
+        self.batcher = asyncio.create_task(self.batch_loop())
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def attribute(self, text):
+        """ Queue one text and wait for its ranking """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future))
+        return await future
+
+    async def batch_loop(self):
+        """ Take requests off the queue in batches and score them """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            texts = [text for text, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.model.rank, texts)
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            self.batches += 1
+            self.batched_texts += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        """ Return request, batch, queue depth and latency figures """
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {'uptime_s': time.time() - self.started,
+                'requests': self.requests,
+                'batches': self.batches,
+                'mean_batch_size': self.batched_texts / self.batches if self.batches else 0.0,
+                'queue_depth': self.queue.qsize(),
+                'latency_ms': {'p50': 1000 * float(np.percentile(latencies, 50)),
+                               'p95': 1000 * float(np.percentile(latencies, 95)),
+                               'max': 1000 * float(latencies.max())}}
+
+    async def handle(self, reader, writer):
+        """ Answer one HTTP request """
+        try:
+            status, body = await self.respond(reader)
+        except (ValueError, UnicodeDecodeError) as error:
+            status, body = '400 Bad Request', {'error': str(error)}
+        except asyncio.IncompleteReadError:
+            status, body = '400 Bad Request', {'error': 'Request ended before Content-Length bytes'}
+        except asyncio.TimeoutError:
+            status, body = '408 Request Timeout', {'error': 'Request was not received in time'}
+        except Exception as error:
+            status, body = '500 Internal Server Error', {'error': str(error)}
+        data = json.dumps(body).encode('utf-8')
+        writer.write('HTTP/1.1 {}\r\nContent-Type: application/json\r\n'
+                     'Content-Length: {}\r\nConnection: close\r\n\r\n'
+                     .format(status, len(data)).encode('ascii') + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def read_head(self, reader):
+        """ Return the method, path and headers of a request """
+        request_line = (await reader.readline()).decode('ascii').split()
+        if len(request_line) < 2:
+            raise ValueError('Malformed request line')
+        headers = dict()
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return request_line[0], request_line[1], headers
+
+    async def respond(self, reader):
+        """ Return the status and JSON body for one request """
+        # a client that stops sending would otherwise hold its connection
+        # (and the memory read so far) forever, so each part of the request
+        # has read_timeout seconds to arrive
+        method, path, headers = await asyncio.wait_for(self.read_head(reader),
+                                                       self.read_timeout)
+        if method == 'GET' and path == '/stats':
+            return '200 OK', self.stats()
+        if method == 'POST' and path == '/attribute':
+            length = int(headers.get('content-length', 0))
+            if length > MAX_BODY:
+                return '413 Payload Too Large', {'error': 'Text is too long'}
+            text = (await asyncio.wait_for(reader.readexactly(length),
+                                           self.read_timeout)).decode('utf-8')
+            start = time.perf_counter()
+            result = await self.attribute(text)
+            latency = time.perf_counter() - start
+            self.requests += 1
+            self.latencies.append(latency)
+            result['latency_ms'] = 1000 * latency
+            return '200 OK', result
+        return '404 Not Found', {'error': 'Use POST /attribute or GET /stats'}
+
+async def serve(references, host='127.0.0.1', port=8000,
+                max_batch=MAX_BATCH, max_delay=MAX_DELAY):
+    """ Load the reference profiles and serve until cancelled """
+    model = AttributionModel(load_profiles(references))
+    app = AttributionServer(model, max_batch, max_delay)
+    server = await app.start(host, port)
+    for sock in server.sockets:
+        print('Serving attribution on http://{}:{}'.format(*sock.getsockname()[:2]))
+    async with server:
+        await server.serve_forever()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stylometry attribution service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000, help='0 picks a free port')
+    parser.add_argument('--reference', action='append', default=[], metavar='AUTHOR=FILE',
+                        help='reference text or saved AuthorProfile (.npz), can be repeated')
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--max-delay', type=float, default=MAX_DELAY,
+                        help='seconds to wait for a batch to fill')
+    args = parser.parse_args()
+    references = dict(reference.split('=', 1) for reference in args.reference)
+    if not references:
+        references = {'doyle': 'hound.txt', 'wells': 'war.txt'}
+    asyncio.run(serve(references, args.host, args.port, args.max_batch, args.max_delay))
@@ -0,0 +1,101 @@
+import json
+from collections import Counter
+import numpy as np
+from ngram_profile import NgramProfile
+from lexicon import get_lexicon
+
+# the count tables kept for every profile, in the order they are saved
+COUNTERS = ('word_lengths', 'stop_words', 'pos', 'vocab')
+
+class AuthorProfile():
+    """ Mergeable count tables describing one author's texts """
+
+    # the stylometry tests only need counts, so an author can be described by
+    # a handful of count tables rather than the full list of words.  Adding a
+    # new document only costs that document: profile += words (or another
+    # AuthorProfile) updates the counts in place
+    def __init__(self, name, tag_pos=True):
+        self.name = name
+        self.tag_pos = tag_pos # part-of-speech tagging is the slow part
+        self.num_words = 0
+        self.word_lengths = Counter()
+        self.stop_words = Counter()
+        self.pos = Counter()
+        self.vocab = Counter()
+        self.ngrams = NgramProfile()
+
+    def add_words(self, words, tags=None):
+        """ Add a document, as a list of words, to the profile """
+        # tags, if given, are the words' part-of-speech tags when they have
+        # already been tagged (see corpus_pipeline.py)
+        lexicon = get_lexicon()
+        stop_words = lexicon.stop_words
+        self.num_words += len(words)
+        self.word_lengths.update(len(word) for word in words)
+        self.stop_words.update(word for word in words if word in stop_words)
+        self.vocab.update(words)
+        if self.tag_pos:
+            self.pos.update(lexicon.pos_tags(words) if tags is None else tags)
+        self.ngrams.add_words(words)
+        return self
+
+    def __iadd__(self, other):
+        """ Merge another AuthorProfile, or a list of words, into this one """
+        if not isinstance(other, AuthorProfile):
+            return self.add_words(other)
+        self.num_words += other.num_words
+        for name in COUNTERS:
+            getattr(self, name).update(getattr(other, name))
+        self.ngrams += other.ngrams
+        return self
+
+    def save(self, filename):
+        """ Save the profile as a compressed .npz file """
+        # each count table is stored as two arrays, keys and counts
+        arrays = {'char_counts': self.ngrams.char_counts,
+                  'word_counts': self.ngrams.word_counts}
+        for name in COUNTERS:
+            table = getattr(self, name)
+            arrays[name + '_keys'] = np.array(list(table.keys()))
+            arrays[name + '_counts'] = np.array(list(table.values()), dtype=np.int64)
+        meta = {'name': self.name, 'tag_pos': self.tag_pos, 'num_words': self.num_words,
+                'ngram_words': self.ngrams.num_words, 'char_n': self.ngrams.char_n,
+                'word_n': self.ngrams.word_n}
+        arrays['meta'] = np.array(json.dumps(meta))
+        with open(filename, 'wb') as outfile:
+            np.savez_compressed(outfile, **arrays)
+
+    @classmethod
+    def load(cls, filename):
+        """ Return a profile saved with save() """
+        with np.load(filename) as arrays:
+            meta = json.loads(str(arrays['meta']))
+            profile = cls(meta['name'], meta['tag_pos'])
+            profile.num_words = meta['num_words']
+            for name in COUNTERS:
+                keys = arrays[name + '_keys'].tolist()
+                counts = arrays[name + '_counts'].tolist()
+                setattr(profile, name, Counter(dict(zip(keys, counts))))
+            char_counts = arrays['char_counts']
+            profile.ngrams = NgramProfile(meta['char_n'], meta['word_n'], len(char_counts))
+            profile.ngrams.char_counts = char_counts.copy()
+            profile.ngrams.word_counts = arrays['word_counts'].copy()
+            profile.ngrams.num_words = meta['ngram_words']
+        return profile
+
+def vocab_chisquared(author, unknown, num_words=1000):
+    """ Return the chi-squared vocabulary statistic between two profiles """
+    # same test as stylometry.vocab_test(), but the counts are looked up in
+    # the profiles instead of counted from the word lists
+    combined = author.vocab + unknown.vocab
+    author_proportion = author.num_words / (author.num_words + unknown.num_words)
+    chisquared = 0
+    for word, combined_count in combined.most_common(num_words):
+        expected_count_author = combined_count * author_proportion
+        chisquared += (author.vocab[word] - expected_count_author)**2 / expected_count_author
+    return chisquared
+
+def jaccard_similarity(author, unknown):
+    """ Return the Jaccard similarity of the vocabularies of two profiles """
+    shared = len(author.vocab.keys() & unknown.vocab.keys())
+    return shared / (len(author.vocab) + len(unknown.vocab) - shared)
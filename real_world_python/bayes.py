@@ -1,8 +1,8 @@
 import sys #commands for the operating system
-import random
+import argparse
 import itertools
-import numpy as np
 import cv2 as cv #import opencv
+from search_rng import SearchRNG
 
 #constant names should be all caps (PEP8)
 MAP_FILE = 'cape_python.png'
@@ -20,8 +20,11 @@ class Search():
     # generally it is better to use class variables, as they act in a similar 
     # to global variables and won't need to be passed as parameters to the 
     # methods of the class
-    def __init__(self, name):
+    def __init__(self, name, rng=None):
         self.name = name
+        # all random draws go through one seeded generator, pass in a
+        # SearchRNG to share it between games or make a run reproducible
+        self.rng = rng if rng is not None else SearchRNG()
         # pass the MAP_FILE to the cv.imread() function. This allows cv2 to 
         # read the file.  Parameter IMREAD_COLOR will allow the program
         # to add colors to the image
@@ -99,20 +102,20 @@ class Search():
         """ Return the actual location of the sailor """
         # num_search_areas = number of search areas used in the game
         # Find sailor coordinates with respect to any Search Area subarray
-        # use np.random.choice(start, stop) to get a position within a search area
+        # use the rng to get a position within a search area
         # note that the areas are all the same and all that is needed
         # is a position within an area (50 x 50), so arbitrarily use sa1.  Also,
         # shape[1] = dimension 1, i.e. column, shape[0] = dimension 0 i.e.
         # row.  These will be equivalent to the x, y coordinated on the 
         # image when it is stored as an array.
-        self.sailor_actual[0] = np.random.choice(self.sa1.shape[1], 1)
-        self.sailor_actual[1] = np.random.choice(self.sa1.shape[0], 1)
+        self.sailor_actual[0], self.sailor_actual[1] = self.rng.position(
+            self.sa1.shape[1], self.sa1.shape[0])
 
-        # now choose a random area to place the sailor in
-        # random.triangular(lowendpoint, highendpoint)
+        # now choose a random area to place the sailor in using a triangular
+        # distribution between 1 and num_search_areas + 1
         # use a local scope variable - area - because this won't be shared
         # with the other methods in the class 
-        area = int(random.triangular(1, num_search_areas + 1))
+        area = self.rng.search_area(num_search_areas)
 
         # since the position is using the coordinates from a particular 
         # search area, these need to be converted to coordinates for the whole map
@@ -136,9 +139,7 @@ class Search():
         """ Set decimal search effectiveness value per search area """
         # search at least 0.20 of the area, but never more than 0.90 of the area
         # note that there is an assumption that the probability is independent
-        self.sep1 = random.uniform(0.2, 0.9)
-        self.sep2 = random.uniform(0.2, 0.9)
-        self.sep3 = random.uniform(0.2, 0.9)
+        self.sep1, self.sep2, self.sep3 = self.rng.effectiveness(0.2, 0.9)
 
     def conduct_search(self, area_num, area_array, effectiveness_prob):
         # area_num = area to search, chosen by the user, area_array  = the area
@@ -151,11 +152,11 @@ class Search():
         # product
         coords = list(itertools.product(local_x_range, local_y_range))
         # randomize the order of the coordinates to prevent repeat searches
-        random.shuffle(coords)
-        # trim the list based on the search effectiveness - this similuates
+        # and trim the list based on the search effectiveness - this similuates
         # leaving an area unsearched. I.e. only search a percent of the 
         # total coordinates that are produced by the cartesian product
-        coords = coords[:int(len(coords) * effectiveness_prob)]
+        order = self.rng.permutation(len(coords))
+        coords = [coords[i] for i in order[:int(len(coords) * effectiveness_prob)]]
         # make a vairable for the sailor's location
         loc_actual = (self.sailor_actual[0], self.sailor_actual[1])
         # check is the sailor is found by the search and return the results
@@ -191,9 +192,12 @@ def draw_menu(search_num):
         """
         )
 
-def main():
-    # create the game application
-    app = Search('Cape_Python')
+def main(rng=None):
+    # create the game application.  The same rng is passed on when a new
+    # game is started, so one --seed reproduces the whole session
+    if rng is None:
+        rng = SearchRNG()
+    app = Search('Cape_Python', rng=rng)
     # set the last known location
     app.draw_map(last_known=(160, 290))
     # set the final location where sailor is found
@@ -251,7 +255,7 @@ def main():
             app.sep1 = 0
         # start the game over, recursively call the main function
         elif choice == "7":
-            main()
+            main(rng)
         # invalid input, tell the user
         else:
             print("\nSorry, but that isn't a valid choice.", file=sys.stderr)
@@ -276,12 +280,16 @@ def main():
         else:
             #sailor was found, circle the location
             print(sailor_x, sailor_y)
-            cv.circle(app.img, (sailor_x[0], sailor_y[0]), 3, (255, 0, 0), -1)
+            cv.circle(app.img, (sailor_x, sailor_y), 3, (255, 0, 0), -1)
             cv.imshow('Search Area', app.img)
             cv.waitKey(1500)
-            main()
+            main(rng)
         # update total number of searches
         search_num += 1
 
 if __name__=='__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Bayes search and rescue game')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed for the random number generator, makes the game reproducible')
+    args = parser.parse_args()
+    main(SearchRNG(args.seed))
\ No newline at end of file
@@ -1,9 +1,22 @@
 import sys #commands for the operating system
-import random
+import argparse
+import time
+import json
+import zlib
+import multiprocessing
 import itertools
+import functools
 import numpy as np
-import cv2 as cv
-from regex import search #import opencv
+import cv2 as cv #import opencv
+from search_rng import SearchRNG
+from run_stats import RunningStats
+from checkpoint import save_checkpoint, load_checkpoint
+from search_trace import TraceWriter
+from search_drift import DriftModel
+from shared_map import SharedMap, map_arrays, attach_map, area_mask
+from scenario import compiled_scenario
+from search_planner import allocate_effort, detection_probabilities
+from search_profile import PhaseTimer, SampledProfiler, profiling_enabled, PROFILE_ENV
 
 #constant names should be all caps (PEP8)
 MAP_FILE = 'cape_python.png'
@@ -11,6 +24,23 @@ MAP_FILE = 'cape_python.png'
 SA1_CORNERS = (130, 265, 180, 315)  # (UpperLeft-X, UpperLeft-Y, LowerRight-X, LowerRight-Y)
 SA2_CORNERS = (80, 255, 130, 305)  # (UL-X, UL-Y, LR-X, LR-Y)
 SA3_CORNERS = (105, 205, 155, 255) # (UL-X, UL-Y, LR-X, LR-Y)
+LAST_KNOWN = (160, 290) # (x, y) where the sailor was last seen
+# a large effort makes 1 - exp(-z) round to exactly 1, which would leave
+# nothing for bayes theorem to rescale, so planned searches stop just short
+MAX_PLANNED_EFFECTIVENESS = 1.0 - 1e-9
+
+@functools.lru_cache(maxsize=None)
+def area_coords(width, height):
+    """ Return every local (x, y) in a width x height search area """
+    return tuple(itertools.product(range(width), range(height)))
+
+@functools.lru_cache(maxsize=None)
+def default_area_mask(shape):
+    """ Return the area mask of the SA*_CORNERS areas on a map of this shape """
+    mask = area_mask((SA1_CORNERS, SA2_CORNERS, SA3_CORNERS), shape)
+    # shared by every game, like a mask attached from shared memory
+    mask.flags.writeable = False
+    return mask
 
 #class names should begin with a cap (PEP8)
 class Search():
@@ -21,40 +51,69 @@ class Search():
     # generally it is better to use class variables, as they act in a similar 
     # to global variables and won't need to be passed as parameters to the 
     # methods of the class
-    def __init__(self, name):
+    def __init__(self, name, rng=None, drift=None, shared=None):
         self.name = name
-        # pass the MAP_FILE to the cv.imread() function. This allows cv2 to 
-        # read the file.  Parameter IMREAD_COLOR will allow the program
-        # to add colors to the image
-        self.img = cv.imread(MAP_FILE, cv.IMREAD_COLOR)
+        # an optional DriftModel moves the sailor between rounds of searching
+        self.drift = drift
+        # all random draws go through one seeded generator, pass in a
+        # SearchRNG to share it between games or make a run reproducible
+        self.rng = rng if rng is not None else SearchRNG()
+        # shared holds the map arrays built by shared_map.map_arrays(), either
+        # attached read-only from the parent process or compiled from a
+        # scenario file (see scenario.py).  Otherwise the module constants
+        # are used and the map is read from MAP_FILE
+        if shared is not None:
+            self.img = shared['img']
+            self.corners = tuple(tuple(int(v) for v in corners) for corners in shared['corners'])
+            self.area_mask = shared['area_mask']
+        else:
+            # pass the MAP_FILE to the cv.imread() function. This allows cv2 to 
+            # read the file.  Parameter IMREAD_COLOR will allow the program
+            # to add colors to the image
+            self.img = cv.imread(MAP_FILE, cv.IMREAD_COLOR)
+            self.corners = (SA1_CORNERS, SA2_CORNERS, SA3_CORNERS)
+            self.area_mask = None
         # In case the image file DNE, tell user and quit
         if self.img is None:
             # print a useful warning in the system stderr color to the user
             print("Could load map file {}".format(MAP_FILE, file=sys.stderr))
             sys.exit()
+        if self.area_mask is None:
+            self.area_mask = default_area_mask(self.img.shape[:2])
         # actual location of the sailor
         self.area_actual = 0 # search area of the sailor
         self.sailor_actual = [0,0] #exact location
         # map image is loaded as a numpy array
         # split this area using slicing into three different areas using the 
-        # module constants.  These are pairing the x and y corners of the image
-        self.sa1 = self.img[SA1_CORNERS[1] : SA1_CORNERS[3],
-                            SA1_CORNERS[0] : SA1_CORNERS[2]]
-        self.sa2 = self.img[SA2_CORNERS[1] : SA2_CORNERS[3],
-                            SA2_CORNERS[0] : SA2_CORNERS[2]]
-        self.sa3 = self.img[SA3_CORNERS[1] : SA3_CORNERS[3],
-                            SA3_CORNERS[0] : SA3_CORNERS[2]]
-        # initial probabilities for each area
+        # corners.  These are pairing the x and y corners of the image
+        sa1_corners, sa2_corners, sa3_corners = self.corners
+        self.sa1 = self.img[sa1_corners[1] : sa1_corners[3],
+                            sa1_corners[0] : sa1_corners[2]]
+        self.sa2 = self.img[sa2_corners[1] : sa2_corners[3],
+                            sa2_corners[0] : sa2_corners[2]]
+        self.sa3 = self.img[sa3_corners[1] : sa3_corners[3],
+                            sa3_corners[0] : sa3_corners[2]]
+        # initial probabilities for each area and the range of search
+        # effectiveness, a scenario can set its own
         self.p1 = 0.2
         self.p2 = 0.5
         self.p3 = 0.3
+        self.effectiveness_range = (0.2, 0.9)
+        self.last_known = LAST_KNOWN
+        if shared is not None and 'priors' in shared:
+            self.p1, self.p2, self.p3 = shared['priors'].tolist()
+            self.effectiveness_range = tuple(shared['effectiveness'].tolist())
+            self.last_known = tuple(int(v) for v in shared['last_known'])
         # search efficiency
         self.sep1 = 0
         self.sep2 = 0
         self.sep3 = 0
 
-    def draw_map(self, last_known):
+    def draw_map(self, last_known=None):
         """ Display basemap with scale, last known (x,y) location,  and search areas """
+        # the last known location defaults to the map's own
+        if last_known is None:
+            last_known = self.last_known
         # make the scale for the map
         # draw the bar
         # cv.line(imgfile, startposition, stopposition, color, linewidth)
@@ -65,26 +124,16 @@ class Search():
         cv.putText(self.img, '50 nautical miles', (71, 370), cv.FONT_HERSHEY_PLAIN, 1, (0,0,0))
 
         # make the search areas and label them
-        # draw a rectangle around the search area
-        # cv.rectangle(imgfile, upperleftcorner, lowerrightcorner, color, lineweight)
-        cv.rectangle(self.img, (SA1_CORNERS[0], SA1_CORNERS[1]), (SA1_CORNERS[2], SA1_CORNERS[3]),
-                        (0,0,0), 1)
-        # label the search area
-        # note it is offset from the upper left corner of the rectangle
-        cv.putText(self.img, '1', (SA1_CORNERS[0]+3, SA1_CORNERS[1]+15), cv.FONT_HERSHEY_PLAIN, 1, 0)
-        # search area 2
-        cv.rectangle(self.img, (SA2_CORNERS[0], SA2_CORNERS[1]),
-                     (SA2_CORNERS[2], SA2_CORNERS[3]), (0, 0, 0), 1)
-        cv.putText(self.img, '2',
-                   (SA2_CORNERS[0] + 3, SA2_CORNERS[1] + 15),
-                   cv.FONT_HERSHEY_PLAIN, 1, 0)
-        # search area 3
-        cv.rectangle(self.img, (SA3_CORNERS[0], SA3_CORNERS[1]),
-                     (SA3_CORNERS[2], SA3_CORNERS[3]), (0, 0, 0), 1)
-        cv.putText(self.img, '3',
-                   (SA3_CORNERS[0] + 3, SA3_CORNERS[1] + 15),
-                   cv.FONT_HERSHEY_PLAIN, 1, 0)
-        
+        for number, corners in enumerate(self.corners, start=1):
+            # draw a rectangle around the search area
+            # cv.rectangle(imgfile, upperleftcorner, lowerrightcorner, color, lineweight)
+            cv.rectangle(self.img, (corners[0], corners[1]), (corners[2], corners[3]),
+                         (0,0,0), 1)
+            # label the search area
+            # note it is offset from the upper left corner of the rectangle
+            cv.putText(self.img, str(number), (corners[0]+3, corners[1]+15),
+                       cv.FONT_HERSHEY_PLAIN, 1, 0)
+
         # add annotation for last known position anc actual position
         # note that (0,0,255) is red because openCV uses (blue, green , red)
         cv.putText(self.img, '+', (last_known), cv.FONT_HERSHEY_PLAIN, 1, (0, 0, 255))
@@ -100,69 +149,116 @@ class Search():
         """ Return the actual location of the sailor """
         # num_search_areas = number of search areas used in the game
         # Find sailor coordinates with respect to any Search Area subarray
-        # use np.random.choice(start, stop) to get a position within a search area
+        # use the rng to get a position within a search area
         # note that the areas are all the same and all that is needed
         # is a position within an area (50 x 50), so arbitrarily use sa1.  Also,
         # shape[1] = dimension 1, i.e. column, shape[0] = dimension 0 i.e.
         # row.  These will be equivalent to the x, y coordinated on the 
         # image when it is stored as an array.
-        self.sailor_actual[0] = np.random.choice(self.sa1.shape[1], 1)
-        self.sailor_actual[1] = np.random.choice(self.sa1.shape[0], 1)
+        self.sailor_actual[0], self.sailor_actual[1] = self.rng.position(
+            self.sa1.shape[1], self.sa1.shape[0])
 
-        # now choose a random area to place the sailor in
-        # random.triangular(lowendpoint, highendpoint)
+        # now choose a random area to place the sailor in using a triangular
+        # distribution between 1 and num_search_areas + 1
         # use a local scope variable - area - because this won't be shared
         # with the other methods in the class 
-        area = int(random.triangular(1, num_search_areas + 1))
+        area = self.rng.search_area(num_search_areas)
 
         # since the position is using the coordinates from a particular 
         # search area, these need to be converted to coordinates for the whole map
-        if area == 1:
-            x = self.sailor_actual[0] + SA1_CORNERS[0]
-            y = self.sailor_actual[1] + SA1_CORNERS[1]
-            self.area_actual = 1
-        elif area == 2:
-            x = self.sailor_actual[0] + SA2_CORNERS[0]
-            y = self.sailor_actual[1] + SA2_CORNERS[1]
-            self.area_actual = 2
-        elif area == 3:
-            x = self.sailor_actual[0] + SA3_CORNERS[0]
-            y = self.sailor_actual[1] + SA3_CORNERS[1]
-            self.area_actual = 3
+        corners = self.corners[area - 1]
+        x = self.sailor_actual[0] + corners[0]
+        y = self.sailor_actual[1] + corners[1]
+        self.area_actual = area
         
+        # keep the position on the whole map for drift_step()
+        self.sailor_global = [float(x), float(y)]
         # return the coordinates
         return x, y
 
+    def area_at(self, x, y):
+        """ Return the search area number at map (x, y), or 0 if none """
+        for area, corners in enumerate(self.corners, start=1):
+            if corners[0] <= x < corners[2] and corners[1] <= y < corners[3]:
+                return area
+        return 0
+
+    def init_grid(self):
+        """ Spread the area probabilities over a map sized probability grid """
+        # each area's probability is shared evenly between its cells.  The
+        # area mask, marking the cells inside any search area, is built
+        # once with the map (see shared_map.area_mask())
+        self.grid = np.zeros(self.img.shape[:2], dtype=np.float64)
+        for corners, p in zip(self.corners, (self.p1, self.p2, self.p3)):
+            cells = self.grid[corners[1] : corners[3], corners[0] : corners[2]]
+            cells[:] = p / cells.size
+        # only this part of the map can ever hold any probability
+        self.grid_region = None
+        if self.drift is not None:
+            self.grid_region = self.drift.region(self.corners,
+                                                 self.grid.shape)
+            # share of each cell's probability that drifts into a search
+            # area, the same for every step and every game on this mask
+            self.grid_kept = self.drift.kept_fraction(self.area_mask, self.grid_region)
+
+    def grid_probabilities(self):
+        """ Set p1, p2 and p3 from the probability grid """
+        self.p1, self.p2, self.p3 = [
+            float(self.grid[corners[1] : corners[3], corners[0] : corners[2]].sum())
+            for corners in self.corners]
+
+    def update_grid(self):
+        """ Update the probability grid with the last search effectiveness """
+        # bayes theorem cell by cell: the chance the sailor is in a searched
+        # cell shrinks by the search effectiveness, then everything is
+        # rescaled to sum to one
+        for corners, sep in zip(self.corners,
+                                (self.sep1, self.sep2, self.sep3)):
+            self.grid[corners[1] : corners[3], corners[0] : corners[2]] *= 1 - sep
+        self.grid /= self.grid.sum()
+        self.grid_probabilities()
+
+    def drift_step(self):
+        """ Move the sailor and the probability grid by one drift step """
+        x, y = self.drift.move(self.sailor_global[0], self.sailor_global[1], self.rng)
+        area = self.area_at(int(x), int(y))
+        # a sailor drifting out of every search area stays put instead, so the
+        # game can always end.  advect() moves the probability by the same rule
+        if area:
+            corners = self.corners[area - 1]
+            self.sailor_global = [x, y]
+            self.area_actual = area
+            self.sailor_actual = [int(x) - corners[0], int(y) - corners[1]]
+        self.grid = self.drift.advect(self.grid, self.area_mask, self.grid_region,
+                                      self.grid_kept)
+        self.grid_probabilities()
+
     def calc_search_effectiveness(self):
         """ Set decimal search effectiveness value per search area """
         # search at least 0.20 of the area, but never more than 0.90 of the area
         # note that there is an assumption that the probability is independent
-        self.sep1 = random.uniform(0.2, 0.9)
-        self.sep2 = random.uniform(0.2, 0.9)
-        self.sep3 = random.uniform(0.2, 0.9)
+        self.sep1, self.sep2, self.sep3 = self.rng.effectiveness(*self.effectiveness_range)
 
     def conduct_search(self, area_num, area_array, effectiveness_prob):
         # area_num = area to search, chosen by the user, area_array  = the area
         # subarray and effectiveness_prob = the effectiveness of the search
         """ Return search results and list of searched coordinates """
-        # coordinate range within the search area
-        local_y_range = range(area_array.shape[0])
-        local_x_range = range(area_array.shape[1])
-        # generate all the points within the search area.  This is a cartesian
-        # product
-        coords = list(itertools.product(local_x_range, local_y_range))
+        # all the points within the search area, the cartesian product of the
+        # x and y ranges, built once per area size
+        height, width = area_array.shape[:2]
+        all_coords = area_coords(width, height)
         # randomize the order of the coordinates to prevent repeat searches
-        random.shuffle(coords)
-        # trim the list based on the search effectiveness - this similuates
+        # and trim the list based on the search effectiveness - this similuates
         # leaving an area unsearched. I.e. only search a percent of the 
         # total coordinates that are produced by the cartesian product
-        coords = coords[:int(len(coords) * effectiveness_prob)]
-        # make a vairable for the sailor's location
-        loc_actual = (self.sailor_actual[0], self.sailor_actual[1])
+        order = self.rng.permutation(len(all_coords))[:int(len(all_coords) * effectiveness_prob)]
+        coords = [all_coords[i] for i in order]
         # check is the sailor is found by the search and return the results
         # to the user.  Recall that the sailor's location is determined by the
-        # area number, and the position in local coordinates within that area
-        if area_num == self.area_actual and loc_actual in coords:
+        # area number, and the position in local coordinates within that area.
+        # Local (x, y) is item x * height + y of the cartesian product
+        sailor_index = self.sailor_actual[0] * height + self.sailor_actual[1]
+        if area_num == self.area_actual and np.any(order == sailor_index):
             # return 'Found in area {}'.format(area_num), coords
             #return true instead
             return True, coords
@@ -170,6 +266,49 @@ class Search():
             # return 'Not found', coords
             return False, coords
 
+    def place_targets(self, num_targets, num_search_areas=3):
+        """ Place several people in the water at once, one row per target """
+        # the same distributions as sailor_final_location(), drawn for all
+        # targets in one go.  Each target also gets its own copy of the area
+        # probabilities to update as the searches go by
+        self.targets_local = self.rng.positions(self.sa1.shape[1], self.sa1.shape[0], num_targets)
+        self.targets_area = self.rng.search_areas(num_search_areas, num_targets)
+        self.targets_found = np.zeros(num_targets, dtype=bool)
+        self.target_probs = np.tile([self.p1, self.p2, self.p3], (num_targets, 1))
+
+    def search_targets(self, area_num, area_array, effectiveness_prob):
+        """ Search an area for every target, return the indexes of those found """
+        # the searched cells are marked on a boolean mask of the area, then all
+        # the targets are checked against it with one array lookup, so the
+        # cost hardly grows with the number of targets
+        height, width = area_array.shape[:2]
+        # the same cells conduct_search() would pick: cell i of the shuffled
+        # cartesian product (x, y) is x = i // height, y = i % height
+        order = self.rng.permutation(width * height)[:int(width * height * effectiveness_prob)]
+        searched = np.zeros((height, width), dtype=bool)
+        searched[order % height, order // height] = True
+        hits = ((self.targets_area == area_num) & ~self.targets_found
+                & searched[self.targets_local[:, 1], self.targets_local[:, 0]])
+        self.targets_found |= hits
+        return np.nonzero(hits)[0], searched
+
+    def update_target_probabilities(self):
+        """ Update every target's area probabilities with bayes theorem """
+        # one row per target, all updated at once with the same search
+        # effectiveness values
+        self.target_probs *= 1 - np.array([self.sep1, self.sep2, self.sep3])
+        self.target_probs /= self.target_probs.sum(axis=1, keepdims=True)
+
+    def update_probabilities(self):
+        """ Update the target probabilities with bayes theorem and the search effectiveness """
+        # the chance the sailor is in an area drops by the chance the search
+        # of that area would have found them
+        denom = (self.p1 * (1 - self.sep1) + self.p2 * (1 - self.sep2)
+                 + self.p3 * (1 - self.sep3))
+        self.p1 = self.p1 * (1 - self.sep1) / denom
+        self.p2 = self.p2 * (1 - self.sep2) / denom
+        self.p3 = self.p3 * (1 - self.sep3) / denom
+
     def revise_target_prbabilities(self):
         """ Update the target probabilities based on search effectiveness """
         # calculated via bayes theorem
@@ -195,22 +334,183 @@ def draw_menu(search_num):
         """
         )
 
-def monte_carlo_run():
-    outcomes = []
+# map arrays Search uses in place of the module constants, set when playing
+# a scenario file and in worker processes (attached from shared memory)
+_shared_map = None
+_shared_maps = []
+_shared_blocks = []
+
+def use_map(arrays):
+    """ Play the following games on these map arrays, None for the constants """
+    global _shared_map
+    _shared_map = arrays
+
+def init_worker(specs):
+    """ Pool initializer, attach to the maps published by the parent process """
+    for spec in specs:
+        arrays, blocks = attach_map(spec)
+        _shared_maps.append(arrays)
+        _shared_blocks.extend(blocks)
+
+def run_games(seed, num_games, drift=None, policy='greedy', effort=2.0, targets=1,
+              map_index=0):
+    """ Play num_games games in a worker and return the RunningStats state """
+    use_map(_shared_maps[map_index])
+    rng = SearchRNG(seed)
+    stats = RunningStats()
+    for game_id in range(num_games):
+        stats.add(monte_carlo_run(rng, None, game_id, drift, policy, effort, targets))
+    return stats.get_state()
+
+def parallel_study(num_games, workers, seed=None, drift=None, policy='greedy',
+                   effort=2.0, targets=1, maps=None, games_per_task=250):
+    """ Run num_games games on each map across worker processes """
+    # maps is a list of map arrays (see shared_map.map_arrays() and
+    # scenario.compile_scenario()), by default the module constants.  Each is
+    # built once and shared with every worker.  Each task gets its own seed
+    # spawned from seed, so the results do not depend on the number of
+    # workers or the order the tasks finish in.  Returns one RunningStats
+    # per map, in order
+    if maps is None:
+        maps = [map_arrays(MAP_FILE, (SA1_CORNERS, SA2_CORNERS, SA3_CORNERS))]
+    chunks = [games_per_task] * (num_games // games_per_task)
+    if num_games % games_per_task:
+        chunks.append(num_games % games_per_task)
+    # every map is played with the same task seeds, so differences between
+    # scenarios are not hidden by different random draws
+    task_seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    tasks = [(task_seed, task_games, drift, policy, effort, targets, map_index)
+             for map_index in range(len(maps))
+             for task_seed, task_games in zip(task_seeds, chunks)]
+    published = []
+    try:
+        for arrays in maps:
+            published.append(SharedMap(arrays))
+        with multiprocessing.Pool(workers, initializer=init_worker,
+                                  initargs=([shared.spec for shared in published],)) as pool:
+            states = pool.starmap(run_games, tasks)
+    finally:
+        for shared in published:
+            shared.close()
+    stats_by_map = [RunningStats() for _ in maps]
+    for task, state in zip(tasks, states):
+        task_stats = RunningStats()
+        task_stats.set_state(state)
+        stats_by_map[task[-1]].merge(task_stats)
+    return stats_by_map
+
+def planned_effectiveness(allocation):
+    """ Return the search effectiveness of each area for a split of effort """
+    return np.minimum(detection_probabilities(allocation), MAX_PLANNED_EFFECTIVENESS).tolist()
+
+def positive_float(text):
+    """ argparse type for a float greater than zero """
+    value = float(text)
+    if not value > 0:
+        raise argparse.ArgumentTypeError('must be greater than 0, got {}'.format(text))
+    return value
+
+def positive_int(text):
+    """ argparse type for a whole number greater than zero """
+    value = int(text)
+    if not value > 0:
+        raise argparse.ArgumentTypeError('must be greater than 0, got {}'.format(text))
+    return value
+
+def non_negative_float(text):
+    """ argparse type for a float of zero or more """
+    value = float(text)
+    if not value >= 0:
+        raise argparse.ArgumentTypeError('must not be negative, got {}'.format(text))
+    return value
+
+def monte_carlo_run_multi(rng, num_targets, policy='greedy', effort=2.0):
+    """ Play one game with several targets, return the searches to find them all """
+    app = Search('Cape_Python', rng=rng, shared=_shared_map)
+    app.place_targets(num_targets)
+    areas = ((1, app.sa1), (2, app.sa2), (3, app.sa3))
+    search_num = 0
+    while not app.targets_found.all():
+        search_num += 1
+        # how many of the missing targets each area is expected to hold
+        expected = app.target_probs[~app.targets_found].sum(axis=0)
+        if policy == 'planned':
+            allocation = allocate_effort(expected, effort)
+            app.sep1, app.sep2, app.sep3 = planned_effectiveness(allocation)
+            for (area_num, area_array), sep in zip(areas, (app.sep1, app.sep2, app.sep3)):
+                if sep > 0:
+                    app.search_targets(area_num, area_array, sep)
+        else:
+            # search the area expected to hold the most targets twice, as
+            # menu choices 1 to 3 do
+            area_num, area_array = areas[int(expected.argmax())]
+            app.calc_search_effectiveness()
+            sep = (app.sep1, app.sep2, app.sep3)[area_num - 1]
+            _, searched_1 = app.search_targets(area_num, area_array, sep)
+            _, searched_2 = app.search_targets(area_num, area_array, sep)
+            seps = [0.0, 0.0, 0.0]
+            seps[area_num - 1] = (searched_1 | searched_2).mean()
+            app.sep1, app.sep2, app.sep3 = seps
+        app.update_target_probabilities()
+    return search_num
+
+def planned_search(app, effort):
+    """ Search the areas with the planner's split of effort, return True if found """
+    # the effort is spread to give the best chance of finding the sailor,
+    # and each area's effectiveness follows from the effort it gets
+    allocation = allocate_effort([app.p1, app.p2, app.p3], effort)
+    app.sep1, app.sep2, app.sep3 = planned_effectiveness(allocation)
+    found = False
+    for area_num, area_array, sep in ((1, app.sa1, app.sep1), (2, app.sa2, app.sep2),
+                                      (3, app.sa3, app.sep3)):
+        if sep > 0:
+            result, _ = app.conduct_search(area_num, area_array, sep)
+            found = found or result
+    return found
+
+def monte_carlo_run(rng=None, trace=None, game_id=0, drift=None, policy='greedy', effort=2.0,
+                    targets=1):
+    """ Play one game automatically and return the number of searches """
+    # pass the same rng to every game so one seed reproduces the whole batch.
+    # If a TraceWriter is passed in as trace, every search step is recorded
+    # under game_id.  With a DriftModel the sailor is placed once and then
+    # drifts between searches, and the probabilities are kept on a map grid.
+    # policy 'greedy' searches the most likely area twice (menu choices 1 to
+    # 3), 'planned' splits effort units of search across all the areas with
+    # allocate_effort() and is recorded as choice 0 in the trace.  With more
+    # than one target the game is played by monte_carlo_run_multi(), which is
+    # a different model: there the targets are placed once and the area
+    # probabilities get a real Bayes update from what was searched.  The one
+    # target game keeps the original rules (without drift the sailor is
+    # placed again before every search), so its results are not the
+    # targets=1 point of the multi target curve
+    if rng is None:
+        rng = SearchRNG()
+    if targets > 1:
+        return monte_carlo_run_multi(rng, targets, policy, effort)
     #make game and draw map
-    app = Search('Cape_Python')
+    app = Search('Cape_Python', rng=rng, drift=drift, shared=_shared_map)
+    if drift is not None:
+        sailor_x, sailor_y = app.sailor_final_location(num_search_areas=3)
+        app.init_grid()
     #get final location of sailor
     #keep track of how many searches
     search_num = 0
     found = False
-    choice =random.choice([1,2,3])
+    choice = rng.choice([1,2,3])
     while not found:
-        sailor_x, sailor_y = app.sailor_final_location(num_search_areas=3)
+        if drift is None:
+            sailor_x, sailor_y = app.sailor_final_location(num_search_areas=3)
         # print("-" * 65)
         # print("\nInitial Target (P) Probabilities:")
         # print("P1 = {:.3f}, P2 = {:.3f}, P3 = {:.3f}".format(app.p1, app.p2, app.p3))
         search_num += 1
-        app.calc_search_effectiveness()
+        if policy == 'planned':
+            choice = 0
+            results_1 = planned_search(app, effort)
+            results_2 = False
+        else:
+            app.calc_search_effectiveness()
         # print(f"Choice: {choice}")
         if choice == 1:
             # search the area twice
@@ -250,7 +550,12 @@ def monte_carlo_run():
             results_1, coords_1 = app.conduct_search(2, app.sa2, app.sep2)
             results_2, coords_2 = app.conduct_search(3, app.sa3, app.sep3)
             app.sep1 = 0
-        app.revise_target_prbabilities()
+        if drift is not None:
+            app.update_grid()
+        elif policy == 'planned':
+            app.update_probabilities()
+        else:
+            app.revise_target_prbabilities()
         # print out the results of the search
         # print("\nSearch {} Results 1 = {}"
         #       .format(search_num, results_1), file=sys.stderr)
@@ -259,13 +564,19 @@ def monte_carlo_run():
         # print("Search {} Effectiveness (E):".format(search_num))
         # print("E1 = {:.3f}, E2 = {:.3f}, E3 = {:.3f}"
         #       .format(app.sep1, app.sep2, app.sep3))
-                # check if the sailor was found
+        if trace is not None:
+            trace.record(game_id, search_num, choice, (app.sep1, app.sep2, app.sep3),
+                         (app.p1, app.p2, app.p3), results_1 or results_2)
+        # check if the sailor was found
         if results_1 == False and results_2 == False:
             #since sailor wasn't found, print out the recalculated probabilities
             # print("\nNew Target Probabilities (P) for Search {}:"
             #       .format(search_num + 1))
             # print("P1 = {:.3f}, P2 = {:.3f}, P3 = {:.3f}"
             #       .format(app.p1, app.p2, app.p3))
+            # the sailor and the probabilities drift before the next search
+            if drift is not None:
+                app.drift_step()
             #get the max value 
             probs = [app.p1, app.p2, app.p3]
             max_value = max(probs)
@@ -280,7 +591,7 @@ def main():
     # create the game application
     app = Search('Cape_Python')
     # set the last known location
-    app.draw_map(last_known=(160, 290))
+    app.draw_map(last_known=app.last_known)
     # set the final location where sailor is found
     sailor_x, sailor_y = app.sailor_final_location(num_search_areas=3)
     print("-" * 65)
@@ -361,25 +672,211 @@ def main():
         else:
             #sailor was found, circle the location
             print(sailor_x, sailor_y)
-            cv.circle(app.img, (sailor_x[0], sailor_y[0]), 3, (255, 0, 0), -1)
+            cv.circle(app.img, (sailor_x, sailor_y), 3, (255, 0, 0), -1)
             cv.imshow('Search Area', app.img)
             cv.waitKey(1500)
             main()
         # update total number of searches
         search_num += 1
 
+def study_settings(drift=None, policy='greedy', effort=2.0, targets=1):
+    """ Return every setting that changes the outcome of a game, as plain json values """
+    # saved with each checkpoint, a study can only be resumed with the same
+    # settings.  The map is identified by a checksum of the image plus the
+    # scenario's corners, priors and effectiveness range (a scenario file
+    # describing the original game matches the defaults)
+    if _shared_map is None:
+        img = cv.imread(MAP_FILE, cv.IMREAD_COLOR)
+        # the values Search.__init__() uses without a scenario
+        scenario = {'corners': [SA1_CORNERS, SA2_CORNERS, SA3_CORNERS],
+                    'priors': [0.2, 0.5, 0.3], 'effectiveness': [0.2, 0.9]}
+    else:
+        img = _shared_map['img']
+        scenario = {name: _shared_map[name].tolist()
+                    for name in ('corners', 'priors', 'effectiveness') if name in _shared_map}
+    scenario['img_crc32'] = zlib.crc32(np.ascontiguousarray(img).tobytes())
+    settings = {'policy': policy, 'targets': targets,
+                'current': list(drift.current) if drift is not None else None,
+                'diffusion': drift.diffusion if drift is not None else None,
+                'map': scenario}
+    # only the planned policy spends effort, a greedy study resumes whatever
+    # --effort is given
+    if policy == 'planned':
+        settings['effort'] = effort
+    # round trip through json so tuples and lists compare equal to a loaded checkpoint
+    return json.loads(json.dumps(settings))
+
+def run_study(rng, num_games=1_000, ci_width=None, min_games=100,
+              max_games=1_000_000, report_every=5.0, checkpoint=None,
+              checkpoint_every=60.0, trace=None, profiler=None, drift=None,
+              policy='greedy', effort=2.0, targets=1):
+    """ Run Monte Carlo games and return the RunningStats of searches-to-find """
+    # with ci_width set, keep playing until the 95% confidence interval on the
+    # mean number of searches is narrower than ci_width (sequential stopping),
+    # otherwise play exactly num_games games
+    stats = RunningStats()
+    # pick up where a killed job left off.  The rng state is restored too, so
+    # the resumed study gives exactly the same result as an unbroken one
+    settings = None
+    extra = None
+    if checkpoint is not None:
+        # reads and checksums the map, so only worth doing when checkpointing
+        settings = study_settings(drift, policy, effort, targets)
+        extra = load_checkpoint(checkpoint, stats, rng)
+    if extra is not None:
+        # results from two different games must never be mixed in one study.
+        # Checkpoints written before the other settings were recorded only
+        # hold the policy
+        for name, value in settings.items():
+            saved = extra.get(name, 'greedy' if name == 'policy' else value)
+            if saved != value:
+                raise ValueError("Checkpoint {} is for {} {}, not {}"
+                                 .format(checkpoint, name, saved, value))
+        print("Resumed from {} after {:,} games".format(checkpoint, stats.count))
+    if trace is not None:
+        # throw away trace rows written after the checkpoint, they will be
+        # recorded again by the resumed games
+        trace.reset(extra.get('trace_chunks', 0) if extra is not None else 0)
+
+    def save():
+        # the trace is flushed first so the checkpoint never points at rows
+        # that are still sitting in the buffer
+        extra = dict(settings)
+        if trace is not None:
+            trace.flush()
+            extra['trace_chunks'] = trace.chunk_index
+        save_checkpoint(checkpoint, stats, rng, extra)
+
+    start = time.perf_counter()
+    last_report = last_checkpoint = start
+    resumed_count = stats.count
+    while True:
+        if ci_width is None:
+            if stats.count >= num_games:
+                break
+        elif stats.count >= max_games:
+            break
+        elif stats.count >= min_games and stats.ci_width() <= ci_width:
+            break
+        if profiler is None:
+            stats.add(monte_carlo_run(rng, trace, stats.count, drift, policy, effort, targets))
+        else:
+            # a SampledProfiler runs some of the games under cProfile
+            stats.add(profiler.run(monte_carlo_run, rng, trace, stats.count, drift, policy,
+                                   effort, targets))
+        # print progress every report_every seconds rather than every game
+        now = time.perf_counter()
+        if now - last_report >= report_every:
+            last_report = now
+            print("{:,} games, {:,.0f} games/s, mean = {:.4f}, CI width = {:.4f}"
+                  .format(stats.count, (stats.count - resumed_count) / (now - start),
+                          stats.mean, stats.ci_width()))
+        if checkpoint is not None and now - last_checkpoint >= checkpoint_every:
+            last_checkpoint = now
+            save()
+    if checkpoint is not None:
+        save()
+    elif trace is not None:
+        trace.flush()
+    return stats
+
 if __name__=='__main__':
-    outcomes = []
-    for x in range(1_000):
-        print(f"{x} = Search game number")
-        num_searches = monte_carlo_run()
-        outcomes.append(num_searches)
-    # print("-" * 65)
-    print("-" * 65)
-    print(f"Avg search number: {sum(outcomes)/len(outcomes)} for choices {[1, 2, 3]}")
-    # outcomes = []
-    # for x in range(11):
-    #     num_searches = monte_carlo_run_two_areas()
-    #     outcomes.append(num_searches)
-    print("-" * 65)
-    print(f"Avg search number: {sum(outcomes)/len(outcomes)} for choices {[4, 5, 6]}")
+    parser = argparse.ArgumentParser(description='Monte Carlo study of the Bayes search game')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed for the random number generator, makes the run reproducible')
+    parser.add_argument('--games', type=int, default=1_000,
+                        help='number of games to play when --ci-width is not set')
+    parser.add_argument('--ci-width', type=float, default=None,
+                        help='play until the 95%% CI on the mean number of searches is this narrow')
+    parser.add_argument('--min-games', type=int, default=100,
+                        help='fewest games to play before checking --ci-width')
+    parser.add_argument('--max-games', type=int, default=1_000_000,
+                        help='most games to play when --ci-width is set')
+    parser.add_argument('--report-every', type=float, default=5.0,
+                        help='seconds between progress lines')
+    parser.add_argument('--checkpoint', default=None,
+                        help='file to save progress to, and to resume from if it exists')
+    parser.add_argument('--checkpoint-every', type=float, default=60.0,
+                        help='seconds between checkpoints')
+    parser.add_argument('--trace', default=None,
+                        help='directory to write a per-step trace of every game to')
+    parser.add_argument('--profile', action='store_true',
+                        help='time each phase of the search (same as setting {}=1)'.format(PROFILE_ENV))
+    parser.add_argument('--profile-dump', default=None,
+                        help='file to write cProfile stats for a sample of games to')
+    parser.add_argument('--profile-every', type=int, default=100,
+                        help='run every Nth game under cProfile when --profile-dump is set')
+    parser.add_argument('--current', type=float, nargs=2, default=None, metavar=('DX', 'DY'),
+                        help='drift the sailor by this many pixels between searches')
+    parser.add_argument('--diffusion', type=non_negative_float, default=None,
+                        help='standard deviation in pixels of the random part of the drift')
+    parser.add_argument('--policy', choices=('greedy', 'planned'), default='greedy',
+                        help='greedy: search the most likely area twice, '
+                             'planned: split --effort across the areas with the planner')
+    parser.add_argument('--effort', type=positive_float, default=2.0,
+                        help='search effort per round for the planned policy')
+    parser.add_argument('--workers', type=positive_int, default=None,
+                        help='play --games games across this many processes sharing one map, '
+                             'without it the games are played in this process')
+    parser.add_argument('--targets', type=positive_int, default=1,
+                        help='number of people in the water, a game ends when all are found. '
+                             'Two or more are placed once and tracked with a Bayes update, '
+                             'so they are not comparable with the one sailor game')
+    parser.add_argument('--scenario', nargs='+', default=None, metavar='FILE',
+                        help='play --games games on each of these scenario files (.json or .toml)')
+    args = parser.parse_args()
+    if args.scenario and len(args.scenario) > 1 and (args.checkpoint or args.trace):
+        parser.error('--checkpoint and --trace take a single --scenario')
+    if args.targets > 1 and (args.current is not None or args.diffusion is not None
+                             or args.trace):
+        parser.error('--targets does not support drift or --trace')
+    drift = None
+    if args.current is not None or args.diffusion is not None:
+        drift = DriftModel(args.current or (0.0, 0.0),
+                           args.diffusion if args.diffusion is not None else 1.0)
+    timer = None
+    if args.profile or profiling_enabled():
+        # swap timed versions of the Search methods (and of the game itself)
+        # in place, run_study looks monte_carlo_run up at call time
+        timer = PhaseTimer()
+        timer.instrument(Search)
+        monte_carlo_run = timer.wrap('monte_carlo_run', monte_carlo_run)
+    profiler = None
+    if args.profile_dump:
+        profiler = SampledProfiler(args.profile_dump, every=args.profile_every)
+    names, maps = ['Cape_Python'], None
+    if args.scenario:
+        names, maps = zip(*(compiled_scenario(path) for path in args.scenario))
+    if args.workers:
+        if (args.ci_width is not None or args.checkpoint or args.trace
+                or profiler is not None or timer is not None):
+            parser.error('--workers only supports a fixed number of --games')
+        stats_by_map = parallel_study(args.games, args.workers, args.seed, drift, args.policy,
+                                      args.effort, args.targets, maps)
+    else:
+        stats_by_map = []
+        for arrays in maps or [None]:
+            use_map(arrays)
+            # one generator for the whole batch, the same seed for every scenario
+            rng = SearchRNG(args.seed)
+            stats_by_map.append(run_study(rng, num_games=args.games, ci_width=args.ci_width,
+                                          min_games=args.min_games, max_games=args.max_games,
+                                          report_every=args.report_every,
+                                          checkpoint=args.checkpoint,
+                                          checkpoint_every=args.checkpoint_every,
+                                          trace=TraceWriter(args.trace) if args.trace else None,
+                                          profiler=profiler, drift=drift, policy=args.policy,
+                                          effort=args.effort, targets=args.targets))
+    for name, stats in zip(names, stats_by_map):
+        print("-" * 65)
+        if maps is not None:
+            print(f"Scenario: {name}")
+        print(f"Avg search number: {stats.mean} for policy {args.policy}")
+        print(stats.summary())
+    if timer is not None:
+        print("-" * 65)
+        print(timer.report())
+    if profiler is not None:
+        profiler.dump()
+        print("cProfile stats for {:,} sampled games written to {}"
+              .format(profiler.count // profiler.every, profiler.path))
@@ -0,0 +1,191 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import numpy as np
+from search_rng import SearchRNG
+from search_trace import TRACE_DTYPE
+import bayes
+import bayes_smarter_searches
+import bayes_monte_carlo
+
+GOLDEN_DIR = 'golden' # where record writes, and check reads, the golden files
+GAMES = {'bayes': 200, 'smarter': 50, 'monte_carlo': 1_000} # default games per variant
+MAX_STEPS = 100 # scripted games that have not found the sailor by now are stopped
+KS_ALPHA = 0.01 # significance level of the distribution check
+# critical value factor of the two-sample Kolmogorov-Smirnov test at KS_ALPHA
+KS_FACTOR = np.sqrt(-0.5 * np.log(KS_ALPHA / 2))
+MEAN_Z = 3.0 # standard errors the mean number of searches may move by
+
+class MemoryTrace():
+    """ Collects trace rows in memory, with the TraceWriter.record() interface """
+
+    def __init__(self):
+        self.rows = []
+
+    def record(self, game, step, choice, effectiveness, probabilities, found):
+        """ Add one search step to the trace """
+        self.rows.append((game, step, choice, *effectiveness, *probabilities, found))
+
+    def array(self):
+        """ Return the rows as a TRACE_DTYPE array """
+        return np.array(self.rows, dtype=TRACE_DTYPE)
+
+def scripted_game(module, rng, trace, game_id):
+    """ Play one game of an interactive variant with menu choices drawn from rng """
+    # follows the module's own main() loop step for step, except that the
+    # menu choice (1 to 6) comes from the rng instead of input() and nothing
+    # is drawn.  The sailor is placed once, as in main(), so a game that
+    # keeps missing is stopped after MAX_STEPS and recorded as not found
+    app = module.Search('Cape_Python', rng=rng)
+    app.sailor_final_location(num_search_areas=3)
+    areas = {1: app.sa1, 2: app.sa2, 3: app.sa3}
+    # the pair of areas each menu choice searches
+    searches = {1: (1, 1), 2: (2, 2), 3: (3, 3), 4: (1, 2), 5: (1, 3), 6: (2, 3)}
+    for search_num in range(1, MAX_STEPS + 1):
+        app.calc_search_effectiveness()
+        choice = rng.choice([1, 2, 3, 4, 5, 6])
+        first, second = searches[choice]
+        seps = [app.sep1, app.sep2, app.sep3]
+        results_1, coords_1 = app.conduct_search(first, areas[first], seps[first - 1])
+        results_2, coords_2 = app.conduct_search(second, areas[second], seps[second - 1])
+        if first == second:
+            # searching one area twice, as menu choices 1 to 3 do
+            seps = [0, 0, 0]
+            seps[first - 1] = len(set(coords_1 + coords_2)) / (len(areas[first])**2)
+        else:
+            seps[6 - first - second - 1] = 0
+        app.sep1, app.sep2, app.sep3 = seps
+        app.revise_target_prbabilities()
+        found = results_1 != 'Not found' or results_2 != 'Not found'
+        trace.record(game_id, search_num, choice, (app.sep1, app.sep2, app.sep3),
+                     (app.p1, app.p2, app.p3), found)
+        if found:
+            break
+
+def monte_carlo_game(rng, trace, game_id):
+    """ Play one automatic game of bayes_monte_carlo.py """
+    bayes_monte_carlo.monte_carlo_run(rng, trace, game_id)
+
+# the game player of each variant, called as play(rng, trace, game_id)
+VARIANTS = {
+    'bayes': lambda rng, trace, game_id: scripted_game(bayes, rng, trace, game_id),
+    'smarter': lambda rng, trace, game_id: scripted_game(bayes_smarter_searches, rng,
+                                                         trace, game_id),
+    'monte_carlo': monte_carlo_game,
+}
+
+def run_variant(variant, games, seed):
+    """ Play games of a variant from one seed, return its trace and the seconds taken """
+    rng = SearchRNG(seed)
+    trace = MemoryTrace()
+    play = VARIANTS[variant]
+    start = time.perf_counter()
+    # the interactive variants print as they search, keep that off the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        for game_id in range(games):
+            play(rng, trace, game_id)
+    return trace.array(), time.perf_counter() - start
+
+def searches_to_find(trace):
+    """ Return the number of searches of each game """
+    # a game stopped before the sailor was found counts one more search than
+    # it played, the least it could have needed
+    _, last = np.unique(trace['game'][::-1], return_index=True)
+    last = len(trace) - 1 - last
+    return trace['step'][last] + ~trace['found'][last]
+
+def ks_statistic(a, b):
+    """ Return the two-sample Kolmogorov-Smirnov statistic and its critical value """
+    values = np.union1d(a, b)
+    cdf_a = np.searchsorted(np.sort(a), values, side='right') / len(a)
+    cdf_b = np.searchsorted(np.sort(b), values, side='right') / len(b)
+    return np.abs(cdf_a - cdf_b).max(), KS_FACTOR * np.sqrt((len(a) + len(b)) / (len(a) * len(b)))
+
+def golden_path(directory, variant):
+    """ Return the golden file name of a variant """
+    return os.path.join(directory, variant + '.npz')
+
+def record(variant, directory=GOLDEN_DIR, games=None, seed=0):
+    """ Play a variant and save its trace and runtime as the golden output """
+    games = games or GAMES[variant]
+    trace, seconds = run_variant(variant, games, seed)
+    meta = {'variant': variant, 'games': games, 'seed': seed, 'seconds': seconds,
+            'max_steps': MAX_STEPS, 'numpy': np.__version__,
+            'python': sys.version.split()[0]}
+    os.makedirs(directory, exist_ok=True)
+    # written to a temporary file and moved into place, like the checkpoints
+    path = golden_path(directory, variant)
+    with open(path + '.tmp', 'wb') as outfile:
+        np.savez_compressed(outfile, trace=trace, meta=np.array(json.dumps(meta)))
+    os.replace(path + '.tmp', path)
+    return meta
+
+def check(variant, directory=GOLDEN_DIR, atol=1e-6, exact=False):
+    """ Replay a variant against its golden output, return a result dictionary """
+    # identical: the same steps, choices and probabilities as recorded.  An
+    # engine that draws its random numbers differently cannot be identical,
+    # but must still be equivalent: the searches-to-find distribution may
+    # not differ by the KS test at KS_ALPHA, and the mean may not move by
+    # more than MEAN_Z standard errors.  With exact set only identical passes
+    with np.load(golden_path(directory, variant)) as arrays:
+        golden = arrays['trace']
+        meta = json.loads(str(arrays['meta']))
+    trace, seconds = run_variant(variant, meta['games'], meta['seed'])
+    identical = (len(trace) == len(golden)
+                 and all(np.array_equal(trace[name], golden[name])
+                         for name in ('game', 'step', 'choice', 'found'))
+                 and all(np.allclose(trace[name], golden[name], rtol=0, atol=atol)
+                         for name in ('e1', 'e2', 'e3', 'p1', 'p2', 'p3')))
+    expected, actual = searches_to_find(golden), searches_to_find(trace)
+    ks, ks_critical = ks_statistic(expected, actual)
+    std_error = np.sqrt(expected.var(ddof=1) / len(expected) + actual.var(ddof=1) / len(actual))
+    mean_shift = abs(actual.mean() - expected.mean())
+    equivalent = bool(ks <= ks_critical and mean_shift <= MEAN_Z * std_error)
+    return {'variant': variant, 'identical': bool(identical), 'equivalent': equivalent,
+            'passed': bool(identical or (equivalent and not exact)), 'ks': float(ks),
+            'ks_critical': float(ks_critical), 'golden_mean': float(expected.mean()),
+            'mean': float(actual.mean()), 'golden_seconds': meta['seconds'],
+            'seconds': seconds}
+
+def report(results):
+    """ Return a table of check results """
+    lines = ['{:<12} {:>9} {:>10} {:>7} {:>8} {:>8} {:>9} {:>9} {:>7}'.format(
+        'variant', 'identical', 'equivalent', 'KS', 'golden', 'mean', 'golden s',
+        'now s', 'speed')]
+    for result in results:
+        lines.append('{:<12} {:>9} {:>10} {:>7.3f} {:>8.3f} {:>8.3f} {:>9.2f} {:>9.2f} {:>6.2f}x'
+                     .format(result['variant'], str(result['identical']),
+                             str(result['equivalent']), result['ks'], result['golden_mean'],
+                             result['mean'], result['golden_seconds'], result['seconds'],
+                             result['golden_seconds'] / result['seconds']))
+    return '\n'.join(lines)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Golden output regression checks of the '
+                                                 'Bayes search variants')
+    parser.add_argument('command', choices=('record', 'check'),
+                        help='record: save golden outputs, check: compare against them')
+    parser.add_argument('--variant', nargs='+', choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument('--dir', default=GOLDEN_DIR, help='directory of the golden files')
+    parser.add_argument('--games', type=int, default=None,
+                        help='games to record per variant (default {})'.format(GAMES))
+    parser.add_argument('--seed', type=int, default=0, help='seed to record with')
+    parser.add_argument('--atol', type=float, default=1e-6,
+                        help='largest difference in E and P still counted as identical')
+    parser.add_argument('--exact', action='store_true',
+                        help='fail unless the traces are identical, not just equivalent')
+    args = parser.parse_args()
+    if args.command == 'record':
+        for variant in args.variant:
+            meta = record(variant, args.dir, args.games, args.seed)
+            print('Recorded {variant}: {games:,} games from seed {seed} in {seconds:.2f} s'
+                  .format(**meta))
+    else:
+        results = [check(variant, args.dir, args.atol, args.exact) for variant in args.variant]
+        print(report(results))
+        if not all(result['passed'] for result in results):
+            sys.exit(1)
@@ -0,0 +1,32 @@
+import os
+import json
+import numpy as np
+
+def save_checkpoint(path, stats, rng, extra=None):
+    """ Atomically save the study statistics and rng state to path """
+    # everything goes into one compressed .npz file: the rng arrays by name
+    # plus a json string with the statistics and any extra settings
+    arrays = rng.get_state()
+    meta = {'stats': stats.get_state(), 'games_completed': stats.count,
+            'extra': extra or dict()}
+    arrays['checkpoint_meta'] = np.array(json.dumps(meta))
+    # write to a temporary file next to the checkpoint and then rename it.
+    # os.replace() is atomic, so a job killed part way through a save
+    # always leaves the previous checkpoint intact
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as outfile:
+        np.savez_compressed(outfile, **arrays)
+        outfile.flush()
+        os.fsync(outfile.fileno())
+    os.replace(tmp_path, path)
+
+def load_checkpoint(path, stats, rng):
+    """ Restore stats and rng from path, return the extra settings or None """
+    # a missing checkpoint just means the study starts from scratch
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as arrays:
+        meta = json.loads(str(arrays['checkpoint_meta']))
+        rng.set_state(arrays)
+    stats.set_state(meta['stats'])
+    return meta['extra']
@@ -0,0 +1,171 @@
+import time
+import queue
+import threading
+from corpus_reader import CHUNK_SIZE, words_from_text, iter_text_chunks
+from author_profile import AuthorProfile
+from lexicon import get_lexicon
+
+QUEUE_SIZE = 4 # chunks waiting between two stages, bounds the memory in flight
+# passed down the pipeline after the last chunk
+DONE = object()
+
+class Stage():
+    """ One pipeline stage running on its own thread, with throughput counters """
+
+    # a stage takes items from its input queue, hands each to work() and puts
+    # the result on its output queue.  The queues are bounded, so a slow stage
+    # makes the stages before it block on put() (backpressure) instead of
+    # letting chunks pile up in memory.  busy is the time spent in work(),
+    # waiting the time blocked on an empty input queue and blocked the time
+    # blocked on a full output queue
+    def __init__(self, name, work, inbox, outbox):
+        self.name = name
+        self.work = work
+        self.inbox = inbox
+        self.outbox = outbox
+        self.items = 0
+        self.words = 0
+        self.busy = 0.0
+        self.waiting = 0.0
+        self.blocked = 0.0
+        self.error = None
+        self.thread = None
+
+    def start(self):
+        """ Start the stage's thread """
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """ Process items until the DONE marker, then pass it on """
+        item = None
+        try:
+            while True:
+                start = time.perf_counter()
+                item = self.inbox.get()
+                self.waiting += time.perf_counter() - start
+                if item is DONE:
+                    break
+                start = time.perf_counter()
+                result = self.work(item)
+                self.busy += time.perf_counter() - start
+                self.items += 1
+                self.words += len(result[1])
+                self.put(result)
+        except Exception as error:
+            self.error = error
+            # drain the input so the stages before this one are not left
+            # blocked on a full queue
+            while item is not DONE:
+                item = self.inbox.get()
+        finally:
+            self.put(DONE)
+
+    def put(self, item):
+        """ Put an item on the output queue, timing any backpressure """
+        if self.outbox is None:
+            return
+        start = time.perf_counter()
+        self.outbox.put(item)
+        self.blocked += time.perf_counter() - start
+
+class IngestPipeline():
+    """ Read, tokenize, tag and count several corpora with overlapping stages """
+
+    # reader -> tokenizer -> tagger -> accumulator, one thread each, joined by
+    # bounded queues.  While the tagger works on one chunk the tokenizer is
+    # already splitting the next and the reader decoding the one after, across
+    # documents as well as within them.  Each stage keeps the chunks in order,
+    # so the words, tags and profiles come out exactly as if every file had
+    # been read one after the other
+    def __init__(self, files_by_author, chunk_size=CHUNK_SIZE, queue_size=QUEUE_SIZE,
+                 tag_pos=True):
+        self.files_by_author = files_by_author
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+        self.tag_pos = tag_pos
+        self.words_by_author = {author: [] for author in files_by_author}
+        self.tags_by_author = {author: [] for author in files_by_author}
+        self.profiles_by_author = {author: AuthorProfile(author, tag_pos)
+                                   for author in files_by_author}
+        self.stages = []
+        self.seconds = 0.0
+
+    def read(self):
+        """ Reader stage, yields (author, text) chunks of every file in turn """
+        for author, filename in self.files_by_author.items():
+            for text in iter_text_chunks(filename, self.chunk_size):
+                yield author, text
+
+    def tokenize(self, item):
+        """ Tokenizer stage """
+        author, text = item
+        return author, words_from_text(text)
+
+    def tag(self, item):
+        """ POS tagger stage """
+        author, words = item
+        tags = get_lexicon().pos_tags(words) if self.tag_pos else []
+        return author, words, tags
+
+    def accumulate(self, item):
+        """ Accumulator stage, adds a chunk to its author's words and profile """
+        author, words, tags = item
+        self.words_by_author[author].extend(words)
+        self.tags_by_author[author].extend(tags)
+        self.profiles_by_author[author].add_words(words, tags if self.tag_pos else None)
+        return item
+
+    def run(self):
+        """ Run the pipeline to the end, return the profiles by author """
+        # load the stop words and tagger before the clock starts, so the
+        # first chunk does not look slow
+        get_lexicon()
+        queues = [queue.Queue(self.queue_size) for _ in range(3)]
+        self.stages = [Stage('tokenizer', self.tokenize, queues[0], queues[1]),
+                       Stage('tagger', self.tag, queues[1], queues[2]),
+                       Stage('accumulator', self.accumulate, queues[2], None)]
+        reader = Stage('reader', None, None, queues[0])
+        self.stages.insert(0, reader)
+        start = time.perf_counter()
+        for stage in self.stages[1:]:
+            stage.start()
+        # the reader runs on this thread, it only needs the output queue
+        try:
+            chunks = self.read()
+            while True:
+                work_start = time.perf_counter()
+                item = next(chunks, DONE)
+                reader.busy += time.perf_counter() - work_start
+                if item is DONE or any(stage.error for stage in self.stages):
+                    break
+                reader.items += 1
+                reader.words += len(item[1]) # characters, the words are not split yet
+                reader.put(item)
+        finally:
+            reader.put(DONE)
+            for stage in self.stages[1:]:
+                stage.thread.join()
+        self.seconds = time.perf_counter() - start
+        for stage in self.stages:
+            if stage.error is not None:
+                raise stage.error
+        return self.profiles_by_author
+
+    def report(self):
+        """ Return a table of items, words and time per stage """
+        lines = ['{:<12} {:>8} {:>12} {:>10} {:>10} {:>10} {:>12}'.format(
+            'stage', 'chunks', 'words', 'busy s', 'wait s', 'blocked s', 'words/s')]
+        for stage in self.stages:
+            rate = stage.words / stage.busy if stage.busy else 0.0
+            lines.append('{:<12} {:>8,} {:>12,} {:>10.3f} {:>10.3f} {:>10.3f} {:>12,.0f}'
+                         .format(stage.name, stage.items, stage.words, stage.busy,
+                                 stage.waiting, stage.blocked, rate))
+        lines.append('total {:.3f} s, the reader counts characters'.format(self.seconds))
+        return '\n'.join(lines)
+
+def ingest(files_by_author, chunk_size=CHUNK_SIZE, queue_size=QUEUE_SIZE, tag_pos=True):
+    """ Return a finished IngestPipeline for a dictionary of author to file name """
+    pipeline = IngestPipeline(files_by_author, chunk_size, queue_size, tag_pos)
+    pipeline.run()
+    return pipeline
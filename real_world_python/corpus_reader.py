@@ -0,0 +1,62 @@
+import os
+import re
+import mmap
+import nltk
+
+CHUNK_SIZE = 1 << 20 # bytes of text decoded and tokenized at a time
+# chunks are only split on ASCII whitespace.  In UTF-8 these bytes never
+# appear inside a multi-byte character, so every chunk decodes cleanly and
+# no word is cut in half
+WHITESPACE = re.compile(rb'\s')
+
+def words_from_text(text):
+    """ Return the lower case, alphabetic tokens in a string """
+    # nltk also tokenizes punctuation, str.isalpha() filters that out along
+    # with hyphenated words
+    return [token.lower() for token in nltk.word_tokenize(text) if token.isalpha()]
+
+def _next_boundary(mapped, pos, end):
+    """ Return the first whitespace position at or after pos, or end """
+    if pos >= end:
+        return end
+    match = WHITESPACE.search(mapped, pos, end)
+    return match.start() if match else end
+
+def split_file(filename, num_parts):
+    """ Return (start, end) byte ranges splitting a file into num_parts pieces """
+    # each worker process can map the same file and read only its own range.
+    # The pages come from the operating system's file cache, so the workers
+    # share them rather than each holding a copy
+    size = os.path.getsize(filename)
+    if size == 0:
+        return []
+    with open(filename, 'rb') as infile:
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            starts = [0]
+            for i in range(1, num_parts):
+                boundary = _next_boundary(mapped, max(size * i // num_parts, starts[-1]), size)
+                starts.append(boundary)
+    ends = starts[1:] + [size]
+    return [(start, end) for start, end in zip(starts, ends) if end > start]
+
+def iter_text_chunks(filename, chunk_size=CHUNK_SIZE, start=0, end=None):
+    """ Yield the decoded text of a file one chunk at a time """
+    # the file is memory mapped rather than read, so only the chunk being
+    # decoded is copied into memory and peak memory depends on chunk_size,
+    # not on the size of the file
+    if os.path.getsize(filename) == 0:
+        return
+    with open(filename, 'rb') as infile:
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if end is None:
+                end = len(mapped)
+            pos = start
+            while pos < end:
+                boundary = _next_boundary(mapped, min(pos + chunk_size, end), end)
+                yield mapped[pos:boundary].decode('utf-8', errors='replace')
+                pos = boundary
+
+def iter_words(filename, chunk_size=CHUNK_SIZE, start=0, end=None):
+    """ Yield the words of a file, tokenizing one chunk at a time """
+    for text in iter_text_chunks(filename, chunk_size, start, end):
+        yield from words_from_text(text)
@@ -0,0 +1,43 @@
+import numpy as np
+from nltk.corpus import stopwords
+from nltk.tag import PerceptronTagger
+
+class Lexicon():
+    """ Stop words, shared vocabulary ids and a warm POS tagger """
+
+    # loading nltk resources is slow, so everything here is built once per
+    # process (see get_lexicon()) and shared by every stylometry test.  Words
+    # are given integer ids in the order they are first seen
+    def __init__(self):
+        self.stop_words = frozenset(stopwords.words('english'))
+        # nltk.pos_tag() looks up and loads its tagger on every call, keep
+        # one loaded instance instead
+        self.tagger = PerceptronTagger()
+        self.word_ids = dict()
+        self.words = []
+
+    def ids(self, words):
+        """ Return an array of ids for a list of words, adding new words """
+        word_ids = self.word_ids
+        result = np.empty(len(words), dtype=np.int64)
+        for i, word in enumerate(words):
+            word_id = word_ids.get(word)
+            if word_id is None:
+                word_id = word_ids[word] = len(self.words)
+                self.words.append(word)
+            result[i] = word_id
+        return result
+
+    def pos_tags(self, words):
+        """ Return the part-of-speech tag of each word """
+        return [tag for _, tag in self.tagger.tag(words)]
+
+# the lexicon for this process, created by the first call to get_lexicon()
+_LEXICON = None
+
+def get_lexicon():
+    """ Return the process wide Lexicon, creating it on first use """
+    global _LEXICON
+    if _LEXICON is None:
+        _LEXICON = Lexicon()
+    return _LEXICON
@@ -0,0 +1,86 @@
+import zlib
+import numpy as np
+
+NUM_FEATURES = 1 << 18 # size of each hashed count vector
+CHAR_N = 3 # length of the character n-grams
+WORD_N = 2 # length of the word n-grams
+BATCH_SIZE = 10_000 # words hashed before the counts are updated
+
+def feature_index(ngram, num_features=NUM_FEATURES):
+    """ Return the hashed feature index of an n-gram string """
+    # crc32 is used rather than hash() because hash() of a string changes
+    # from one Python process to the next
+    return zlib.crc32(ngram.encode('utf-8')) % num_features
+
+class NgramProfile():
+    """ Hashed character and word n-gram counts for one corpus """
+
+    # feature hashing maps every n-gram onto one of num_features counters, so
+    # the memory used is fixed no matter how many different n-grams a corpus
+    # has.  Words are fed in with add_words() as they are tokenized, the last
+    # few words are kept so word n-grams carry across calls
+    def __init__(self, char_n=CHAR_N, word_n=WORD_N, num_features=NUM_FEATURES):
+        self.char_n = char_n
+        self.word_n = word_n
+        self.num_features = num_features
+        self.char_counts = np.zeros(num_features, dtype=np.int64)
+        self.word_counts = np.zeros(num_features, dtype=np.int64)
+        self.num_words = 0
+        self._previous = [] # last word_n - 1 words seen
+
+    def add_words(self, words):
+        """ Add a stream of words to the n-gram counts """
+        batch = []
+        for word in words:
+            batch.append(word)
+            if len(batch) >= BATCH_SIZE:
+                self._add_batch(batch)
+                batch = []
+        if batch:
+            self._add_batch(batch)
+        return self
+
+    def __iadd__(self, other):
+        """ Merge the counts of another profile into this one """
+        self.char_counts += other.char_counts
+        self.word_counts += other.word_counts
+        self.num_words += other.num_words
+        return self
+
+    def _add_batch(self, words):
+        """ Hash one batch of words and add the counts with np.bincount """
+        char_indices = []
+        for word in words:
+            # pad with spaces so the n-grams at the start and end of a word
+            # are different from the ones in its middle
+            padded = ' {} '.format(word)
+            char_indices.extend(feature_index(padded[i:i + self.char_n], self.num_features)
+                                for i in range(len(padded) - self.char_n + 1))
+        # the word n-grams include the words carried over from the last batch
+        stream = self._previous + words
+        word_indices = [feature_index(' '.join(stream[i:i + self.word_n]), self.num_features)
+                        for i in range(len(stream) - self.word_n + 1)]
+        self._previous = stream[len(stream) - self.word_n + 1:] if self.word_n > 1 else []
+        self.char_counts += np.bincount(char_indices, minlength=self.num_features)
+        self.word_counts += np.bincount(word_indices, minlength=self.num_features)
+        self.num_words += len(words)
+
+def _normalized(matrix):
+    """ Return the rows of a count matrix scaled to unit length """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def cosine_distances(counts_a, counts_b):
+    """ Return the matrix of cosine distances between two sets of count rows """
+    # every pair is scored with one matrix product rather than a Python loop
+    return 1.0 - _normalized(counts_a) @ _normalized(counts_b).T
+
+def profile_distances(profiles, references, kind='char'):
+    """ Return cosine distances from each profile to each reference profile """
+    # kind is 'char' or 'word', the result has one row per profile and one
+    # column per reference
+    attribute = '{}_counts'.format(kind)
+    return cosine_distances(np.stack([getattr(p, attribute) for p in profiles]),
+                            np.stack([getattr(p, attribute) for p in references]))
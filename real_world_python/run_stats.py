@@ -0,0 +1,93 @@
+import math
+
+# z value for a two sided 95% confidence interval
+Z_95 = 1.959964
+
+class RunningStats():
+    """ Streaming mean, variance and quantiles of game outcomes """
+
+    # the mean and variance are kept with Welford's method, so there is no
+    # need to store every outcome.  The number of searches in a game is a
+    # small whole number, so a histogram of outcomes doubles as an exact
+    # quantile sketch whose size only grows with the largest outcome seen
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # sum of squared differences from the mean
+        self.histogram = dict()
+
+    def add(self, value):
+        """ Add one outcome to the running totals """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.histogram[value] = self.histogram.get(value, 0) + 1
+
+    def merge(self, other):
+        """ Add the outcomes counted by another RunningStats to this one """
+        # the parallel form of Welford's method (Chan et al.), used to combine
+        # the results of separate worker processes
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        for value, n in other.histogram.items():
+            self.histogram[value] = self.histogram.get(value, 0) + n
+        return self
+
+    def get_state(self):
+        """ Return the running totals as a json friendly dictionary """
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2,
+                'histogram': sorted(self.histogram.items())}
+
+    def set_state(self, state):
+        """ Restore running totals returned by get_state() """
+        self.count = state['count']
+        self.mean = state['mean']
+        self.m2 = state['m2']
+        self.histogram = {value: count for value, count in state['histogram']}
+
+    def variance(self):
+        """ Return the sample variance of the outcomes """
+        if self.count < 2:
+            return float('nan')
+        return self.m2 / (self.count - 1)
+
+    def std_error(self):
+        """ Return the standard error of the mean """
+        if self.count < 2:
+            return float('inf')
+        return math.sqrt(self.variance() / self.count)
+
+    def confidence_interval(self, z=Z_95):
+        """ Return the (low, high) confidence interval on the mean """
+        half_width = z * self.std_error()
+        return self.mean - half_width, self.mean + half_width
+
+    def ci_width(self, z=Z_95):
+        """ Return the full width of the confidence interval on the mean """
+        return 2 * z * self.std_error()
+
+    def quantile(self, q):
+        """ Return the q quantile (0 to 1) of the outcomes """
+        if self.count == 0:
+            return float('nan')
+        # walk the sorted histogram until the running count passes q
+        target = q * self.count
+        running = 0
+        for value in sorted(self.histogram):
+            running += self.histogram[value]
+            if running >= target:
+                return value
+        return max(self.histogram)
+
+    def summary(self):
+        """ Return a one line summary of the outcomes so far """
+        low, high = self.confidence_interval()
+        return ("n = {}, mean = {:.4f}, 95% CI = ({:.4f}, {:.4f}), median = {}, p90 = {}"
+                .format(self.count, self.mean, low, high,
+                        self.quantile(0.5), self.quantile(0.9)))
@@ -0,0 +1,80 @@
+import os
+import json
+import functools
+import numpy as np
+from shared_map import map_arrays
+
+try:
+    import tomllib # Python 3.11 and later
+except ImportError:
+    tomllib = None
+
+# the Search class plays a three area game
+NUM_AREAS = 3
+
+def load_scenario(path):
+    """ Return a scenario read from a .json or .toml file, checked for errors """
+    # area corners are (UpperLeft-X, UpperLeft-Y, LowerRight-X, LowerRight-Y)
+    # like the SA*_CORNERS constants, and map_file is relative to the
+    # scenario file
+    if path.endswith('.toml'):
+        if tomllib is None:
+            raise ValueError("Reading {} needs Python 3.11 or later (tomllib)".format(path))
+        with open(path, 'rb') as infile:
+            scenario = tomllib.load(infile)
+    else:
+        with open(path, encoding='utf-8') as infile:
+            scenario = json.load(infile)
+    scenario.setdefault('name', os.path.splitext(os.path.basename(path))[0])
+    scenario['map_file'] = os.path.join(os.path.dirname(path), scenario['map_file'])
+    areas = scenario['areas']
+    if len(areas) != NUM_AREAS or len(scenario['priors']) != NUM_AREAS:
+        raise ValueError("Scenario {} needs {} areas and {} priors"
+                         .format(path, NUM_AREAS, NUM_AREAS))
+    # the sailor's position is drawn once for any area, so they must match
+    sizes = {(lr_x - ul_x, lr_y - ul_y) for ul_x, ul_y, lr_x, lr_y in areas}
+    if len(sizes) != 1 or min(sizes.pop()) <= 0:
+        raise ValueError("Scenario {} areas must all be the same size".format(path))
+    if abs(sum(scenario['priors']) - 1.0) > 1e-6:
+        raise ValueError("Scenario {} priors must add up to 1".format(path))
+    low, high = scenario.get('effectiveness', (0.2, 0.9))
+    if not 0 <= low <= high <= 1:
+        raise ValueError("Scenario {} effectiveness must be a range within 0 to 1".format(path))
+    scenario['effectiveness'] = [low, high]
+    return scenario
+
+def compile_scenario(scenario):
+    """ Return the arrays Search needs for a loaded scenario """
+    # the same arrays as shared_map.map_arrays() (map and area corners) plus
+    # the priors and search settings, so a compiled scenario can be
+    # passed to Search or published to worker processes as it is
+    arrays = map_arrays(scenario['map_file'], scenario['areas'])
+    # every area must lie inside the map, or part of it could never be searched
+    height, width = arrays['img'].shape[:2]
+    for ul_x, ul_y, lr_x, lr_y in scenario['areas']:
+        if not (0 <= ul_x < lr_x <= width and 0 <= ul_y < lr_y <= height):
+            raise ValueError("Scenario {} area {} is outside the {} x {} map"
+                             .format(scenario['name'], (ul_x, ul_y, lr_x, lr_y), width, height))
+    arrays['priors'] = np.array(scenario['priors'], dtype=np.float64)
+    arrays['effectiveness'] = np.array(scenario['effectiveness'], dtype=np.float64)
+    # draw_map() marks the last known position, the middle of the first
+    # area when the scenario does not give one
+    ul_x, ul_y, lr_x, lr_y = scenario['areas'][0]
+    last_x, last_y = scenario.get('last_known', ((ul_x + lr_x) // 2, (ul_y + lr_y) // 2))
+    if not (0 <= last_x < width and 0 <= last_y < height):
+        raise ValueError("Scenario {} last known position {} is outside the {} x {} map"
+                         .format(scenario['name'], (last_x, last_y), width, height))
+    arrays['last_known'] = np.array((last_x, last_y), dtype=np.int32)
+    return arrays
+
+@functools.lru_cache(maxsize=None)
+def _compiled(path, mtime):
+    """ Cached load and compile, keyed on the file's modification time """
+    scenario = load_scenario(path)
+    return scenario['name'], compile_scenario(scenario)
+
+def compiled_scenario(path):
+    """ Return (name, arrays) for a scenario file, compiled once per process """
+    # editing the file changes its modification time, which recompiles it
+    path = os.path.abspath(path)
+    return _compiled(path, os.path.getmtime(path))
@@ -0,0 +1,112 @@
+import math
+import numpy as np
+import cv2 as cv
+
+class DriftModel():
+    """ Sailor drift between searches: a steady current plus diffusion """
+
+    # between rounds of searching the sailor moves by the current (dx, dy)
+    # pixels plus a random Gaussian step of size diffusion.  The probability
+    # grid is moved the same way with a single filter call over the
+    # whole map: the kernel is a Gaussian blob centred on the current
+    # (applied as two 1D passes, see make_kernel())
+    def __init__(self, current=(0.0, 0.0), diffusion=1.0):
+        if diffusion < 0:
+            raise ValueError('Diffusion must not be negative, got {}'.format(diffusion))
+        self.current = current
+        self.diffusion = diffusion
+        self.kernel = self.make_kernel()
+        # the last (mask, region, kept) worked out by kept_fraction()
+        self._kept = None
+
+    def make_kernel(self):
+        """ Return the (x, y) 1D kernels of the motion for one drift step """
+        # a shifted Gaussian is separable, so the 2D kernel is the outer
+        # product of one kernel along x and one along y.  Filtering with the
+        # two 1D kernels is much cheaper than with the full 2D kernel.  With
+        # no diffusion the kernel is a pure shift, split between the two
+        # whole pixels either side of a fractional shift
+        kernels = []
+        for shift in self.current:
+            if self.diffusion > 0:
+                # big enough to hold the shift plus three standard deviations
+                radius = int(math.ceil(abs(shift) + 3 * self.diffusion))
+                offsets = np.arange(-radius, radius + 1)
+                kernel = np.exp(-(offsets - shift)**2 / (2 * self.diffusion**2))
+            else:
+                radius = int(math.ceil(abs(shift)))
+                kernel = np.zeros(2 * radius + 1)
+                whole = math.floor(shift)
+                kernel[radius + whole] = 1 - (shift - whole)
+                if shift != whole:
+                    kernel[radius + whole + 1] = shift - whole
+            kernels.append(kernel / kernel.sum())
+        return tuple(kernels)
+
+    def move(self, x, y, rng):
+        """ Return a new (x, y) for a sailor at (x, y) after one drift step """
+        return (x + rng.normal(self.current[0], self.diffusion),
+                y + rng.normal(self.current[1], self.diffusion))
+
+    def radius(self):
+        """ Return the furthest, in pixels, probability can move in one step """
+        return max(len(kernel) // 2 for kernel in self.kernel)
+
+    def region(self, corners_list, shape):
+        """ Return the slices of the areas' bounding box plus the kernel radius """
+        # probability is zero outside the search areas, so filtering this box
+        # gives the same answer as filtering the whole map for a fraction of
+        # the cost.  corners_list holds (UL-X, UL-Y, LR-X, LR-Y) tuples
+        pad = self.radius()
+        return (slice(max(min(c[1] for c in corners_list) - pad, 0),
+                      min(max(c[3] for c in corners_list) + pad, shape[0])),
+                slice(max(min(c[0] for c in corners_list) - pad, 0),
+                      min(max(c[2] for c in corners_list) + pad, shape[1])))
+
+    def kept_fraction(self, mask, region=None):
+        """ Return the share of each cell's probability that lands on the mask """
+        # filtering the mask with the unflipped kernels adds up, for every
+        # cell, the kernel weight of the moves that end on masked cells.  It
+        # only depends on the mask, so every game played on the same
+        # (precompiled) mask reuses the last answer
+        if (self._kept is not None and self._kept[0] is mask
+                and self._kept[1] == region):
+            return self._kept[2]
+        if region is not None:
+            kept = np.zeros_like(mask)
+            kept[region] = self._filter_mask(mask[region])
+        else:
+            kept = self._filter_mask(mask)
+        self._kept = (mask, region, kept)
+        return kept
+
+    def _filter_mask(self, mask):
+        """ Return the mask filtered with the unflipped kernels """
+        kernel_x, kernel_y = self.kernel
+        return cv.sepFilter2D(mask, -1, kernel_x, kernel_y, borderType=cv.BORDER_CONSTANT)
+
+    def advect(self, grid, mask=None, region=None, kept=None):
+        """ Return the probability grid after one drift step """
+        # kept is kept_fraction(mask), pass it in to save working it out
+        # again on every step
+        if mask is not None and kept is None:
+            kept = self.kept_fraction(mask, region)
+        if region is not None:
+            moved = np.zeros_like(grid)
+            moved[region] = self.advect(grid[region],
+                                        mask[region] if mask is not None else None,
+                                        kept=kept[region] if kept is not None else None)
+            return moved
+        # sepFilter2D correlates rather than convolves, so the kernels are
+        # flipped to push probability forward along the current
+        kernel_x, kernel_y = self.kernel
+        moved = cv.sepFilter2D(grid, -1, kernel_x[::-1].copy(), kernel_y[::-1].copy(),
+                               borderType=cv.BORDER_CONSTANT)
+        if mask is not None:
+            # a sailor whose drift would take them out of every search area
+            # stays put (see Search.drift_step()), so the probability of
+            # those moves stays in the cell it started from
+            moved *= mask
+            moved += grid * (1 - kept)
+        # only rounding error is lost, rescale to keep the total at one
+        return moved / moved.sum()
@@ -0,0 +1,36 @@
+import numpy as np
+
+def detection_probabilities(effort, sweep_rates=1.0):
+    """ Return the chance each area's search finds a target that is there """
+    # the classic exponential (random search) detection function
+    return 1.0 - np.exp(-np.asarray(sweep_rates) * np.asarray(effort))
+
+def allocate_effort(probabilities, budget, sweep_rates=1.0):
+    """ Return the split of budget effort across areas that is most likely to succeed """
+    # maximizes sum(p * (1 - exp(-a * z))) subject to sum(z) == budget and
+    # z >= 0, where p is the area probability, a the sweep rate (how quickly
+    # effort covers that area) and z the effort.  At the optimum every area
+    # that gets effort has the same marginal return p * a * exp(-a * z), so
+    # z = (log(p * a) - log(lambda)) / a.  Sorting the areas by log(p * a)
+    # and trying each possible number of searched areas at once with cumsum
+    # finds lambda exactly, O(n log n) for n areas
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    sweep_rates = np.broadcast_to(np.asarray(sweep_rates, dtype=np.float64),
+                                  probabilities.shape)
+    effort = np.zeros_like(probabilities)
+    if budget <= 0 or not np.any(probabilities > 0):
+        return effort
+    with np.errstate(divide='ignore'):
+        value = np.log(probabilities * sweep_rates)
+    order = np.argsort(-value)
+    value, rates = value[order], sweep_rates[order]
+    usable = np.isfinite(value)
+    value, rates = value[usable], rates[usable]
+    # log(lambda) if the first k areas (k = 1..n) all get some effort
+    inverse_rates = np.cumsum(1.0 / rates)
+    log_lambda = (np.cumsum(value / rates) - budget) / inverse_rates
+    # the largest k whose k-th area still has a positive allocation
+    k = np.nonzero(log_lambda < value)[0][-1]
+    chosen = np.maximum((value[:k + 1] - log_lambda[k]) / rates[:k + 1], 0.0)
+    effort[order[np.nonzero(usable)[0][:k + 1]]] = chosen
+    return effort
@@ -0,0 +1,83 @@
+import os
+import time
+import cProfile
+import functools
+
+# setting this environment variable to anything but 0 turns the timers on
+PROFILE_ENV = 'BAYES_PROFILE'
+# the Search methods that make up one step of a game
+SEARCH_PHASES = ('__init__', 'sailor_final_location', 'calc_search_effectiveness',
+                 'conduct_search', 'revise_target_prbabilities', 'update_probabilities',
+                 'update_grid', 'drift_step', 'search_targets', 'update_target_probabilities')
+
+def profiling_enabled():
+    """ Return True if the profiling environment variable is set """
+    return os.environ.get(PROFILE_ENV, '0') not in ('', '0')
+
+class PhaseTimer():
+    """ Per-phase call counters and timers """
+
+    # nothing is timed until instrument() is called, and instrument() swaps
+    # the timed wrappers onto the class itself, so when profiling is off the
+    # Search methods run exactly as written with no extra overhead
+    def __init__(self):
+        self.calls = dict()
+        self.seconds = dict()
+
+    def wrap(self, name, func):
+        """ Return func wrapped so its calls are counted and timed under name """
+        self.calls.setdefault(name, 0)
+        self.seconds.setdefault(name, 0.0)
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.seconds[name] += time.perf_counter() - start
+                self.calls[name] += 1
+        return timed
+
+    def instrument(self, cls, method_names=SEARCH_PHASES):
+        """ Replace the named methods of cls with timed versions """
+        for method_name in method_names:
+            name = '{}.{}'.format(cls.__name__, method_name)
+            setattr(cls, method_name, self.wrap(name, getattr(cls, method_name)))
+
+    def report(self):
+        """ Return a table of calls, total and mean time per phase """
+        lines = ['{:<40} {:>10} {:>12} {:>12}'.format('phase', 'calls', 'total s', 'mean us')]
+        # slowest phases first
+        for name in sorted(self.seconds, key=self.seconds.get, reverse=True):
+            calls = self.calls[name]
+            mean_us = 1e6 * self.seconds[name] / calls if calls else 0.0
+            lines.append('{:<40} {:>10,} {:>12.3f} {:>12.1f}'
+                         .format(name, calls, self.seconds[name], mean_us))
+        return '\n'.join(lines)
+
+class SampledProfiler():
+    """ Run every Nth call under cProfile and save the combined stats """
+
+    # profiling every game would distort the timings (and the throughput),
+    # so only a sample of games is run under the profiler
+    def __init__(self, path, every=100):
+        self.path = path
+        self.every = every
+        self.count = 0
+        self.profile = cProfile.Profile()
+
+    def run(self, func, *args, **kwargs):
+        """ Call func, under the profiler if this call is in the sample """
+        self.count += 1
+        if self.count % self.every:
+            return func(*args, **kwargs)
+        self.profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.profile.disable()
+
+    def dump(self):
+        """ Write the collected stats to path, readable with pstats """
+        self.profile.dump_stats(self.path)
@@ -0,0 +1,171 @@
+import json
+import numpy as np
+
+# how many values to pre-draw each time a block runs out
+BLOCK_SIZE = 4096
+# permutations are much larger (one per search), so fewer are drawn at a time
+PERMUTATION_BLOCK_SIZE = 64
+
+class SearchRNG():
+    """ Seeded random number source for the Bayes search games """
+
+    # all the randomness in a game comes from one np.random.Generator, so a
+    # single seed makes a whole session or Monte Carlo batch reproducible.
+    # Rather than asking the generator for one number at a time, values are
+    # drawn in large blocks (one numpy call) and handed out one by one.
+    def __init__(self, seed=None):
+        self.seed = seed
+        self.generator = np.random.default_rng(seed)
+        # pre-drawn blocks and the position of the next unused value
+        self._uniforms = np.empty(0)
+        self._uniform_pos = 0
+        self._normals = np.empty(0)
+        self._normal_pos = 0
+        self._triangulars = dict()
+        self._positions = dict()
+        self._permutations = dict()
+        self._last_permutation_length = None
+
+    def uniform(self, low, high):
+        """ Return one uniform value in [low, high) from the pre-drawn block """
+        if self._uniform_pos >= len(self._uniforms):
+            # draw on [0, 1) so one block serves every (low, high) range
+            self._uniforms = self.generator.random(BLOCK_SIZE)
+            self._uniform_pos = 0
+        value = self._uniforms[self._uniform_pos]
+        self._uniform_pos += 1
+        return low + (high - low) * float(value)
+
+    def normal(self, mean=0.0, sigma=1.0):
+        """ Return one normally distributed value from the pre-drawn block """
+        if self._normal_pos >= len(self._normals):
+            self._normals = self.generator.standard_normal(BLOCK_SIZE)
+            self._normal_pos = 0
+        value = self._normals[self._normal_pos]
+        self._normal_pos += 1
+        return mean + sigma * float(value)
+
+    def effectiveness(self, low=0.2, high=0.9, num_areas=3):
+        """ Return a list of search effectiveness values, one per area """
+        return [self.uniform(low, high) for _ in range(num_areas)]
+
+    def _draw_areas(self, num_search_areas):
+        """ Return a block of triangular distributed search area numbers """
+        # same shape as random.triangular(1, num_search_areas + 1), which puts
+        # the mode at the midpoint of the range
+        low, high = 1, num_search_areas + 1
+        block = self.generator.triangular(low, (low + high) / 2, high, BLOCK_SIZE)
+        # truncate to whole area numbers for the whole block at once
+        return block.astype(int)
+
+    def _draw_positions(self, width, height):
+        """ Return a block of local (x, y) positions, one per row """
+        return np.column_stack((self.generator.integers(width, size=BLOCK_SIZE),
+                                self.generator.integers(height, size=BLOCK_SIZE)))
+
+    def _take(self, store, key, n, draw, *args):
+        """ Return the next n values of a pre-drawn block, drawing more as needed """
+        block, pos = store.get(key, (None, BLOCK_SIZE))
+        parts = []
+        while n > 0:
+            if pos >= BLOCK_SIZE:
+                block, pos = draw(*args), 0
+            part = block[pos:pos + n]
+            parts.append(part)
+            pos += len(part)
+            n -= len(part)
+        store[key] = (block, pos)
+        return np.concatenate(parts)
+
+    def search_area(self, num_search_areas):
+        """ Return a search area number using a triangular distribution """
+        key = num_search_areas
+        block, pos = self._triangulars.get(key, (None, BLOCK_SIZE))
+        if pos >= BLOCK_SIZE:
+            block, pos = self._draw_areas(num_search_areas), 0
+        self._triangulars[key] = (block, pos + 1)
+        return int(block[pos])
+
+    def search_areas(self, num_search_areas, n):
+        """ Return an array of n search area numbers, see search_area() """
+        return self._take(self._triangulars, num_search_areas, n,
+                          self._draw_areas, num_search_areas)
+
+    def position(self, width, height):
+        """ Return a local (x, y) position within a width x height area """
+        key = (width, height)
+        block, pos = self._positions.get(key, (None, BLOCK_SIZE))
+        if pos >= BLOCK_SIZE:
+            block, pos = self._draw_positions(width, height), 0
+        self._positions[key] = (block, pos + 1)
+        return int(block[pos, 0]), int(block[pos, 1])
+
+    def positions(self, width, height, n):
+        """ Return an (n, 2) array of local (x, y) positions, see position() """
+        return self._take(self._positions, (width, height), n,
+                          self._draw_positions, width, height)
+
+    def permutation(self, n):
+        """ Return a random ordering of the integers 0 to n - 1 """
+        # each search needs a full shuffle of the area's cells, so many
+        # permutations of the same length are drawn in one call to permuted().
+        # Only one block is kept, and a length that differs from it is only
+        # block drawn once it is asked for twice in a row.  Lengths that
+        # change every call (a shrinking list of unsearched cells) are drawn
+        # one at a time instead of leaving a block behind for each
+        block, pos = self._permutations.get(n, (None, PERMUTATION_BLOCK_SIZE))
+        if block is None and self._permutations and n != self._last_permutation_length:
+            self._last_permutation_length = n
+            return self.generator.permutation(n)
+        if pos >= PERMUTATION_BLOCK_SIZE:
+            block = np.tile(np.arange(n), (PERMUTATION_BLOCK_SIZE, 1))
+            block = self.generator.permuted(block, axis=1)
+            pos = 0
+        self._permutations = {n: (block, pos + 1)}
+        self._last_permutation_length = n
+        return block[pos]
+
+    def choice(self, options):
+        """ Return one item from a list of options """
+        return options[int(self.uniform(0, len(options)))]
+
+    def get_state(self):
+        """ Return the generator state and unused pre-drawn values as arrays """
+        # everything needed to carry on exactly where this rng left off.
+        # Arrays are returned by name so they can go straight into np.savez,
+        # the small bookkeeping values are packed into a json string
+        arrays = {'uniforms': self._uniforms, 'normals': self._normals}
+        meta = {'seed': self.seed,
+                'bit_generator': self.generator.bit_generator.state,
+                'uniform_pos': self._uniform_pos,
+                'normal_pos': self._normal_pos,
+                'last_permutation_length': self._last_permutation_length,
+                'triangulars': [], 'positions': [], 'permutations': []}
+        for key, (block, pos) in self._triangulars.items():
+            arrays['tri_{}'.format(key)] = block
+            meta['triangulars'].append((key, pos))
+        for (width, height), (block, pos) in self._positions.items():
+            arrays['pos_{}_{}'.format(width, height)] = block
+            meta['positions'].append((width, height, pos))
+        for key, (block, pos) in self._permutations.items():
+            arrays['perm_{}'.format(key)] = block
+            meta['permutations'].append((key, pos))
+        arrays['rng_meta'] = np.array(json.dumps(meta))
+        return arrays
+
+    def set_state(self, arrays):
+        """ Restore a state returned by get_state() """
+        meta = json.loads(str(arrays['rng_meta']))
+        self.seed = meta['seed']
+        self.generator.bit_generator.state = meta['bit_generator']
+        self._uniforms = np.array(arrays['uniforms'])
+        self._uniform_pos = meta['uniform_pos']
+        self._normals = np.array(arrays['normals'])
+        self._normal_pos = meta['normal_pos']
+        self._triangulars = {key: (np.array(arrays['tri_{}'.format(key)]), pos)
+                             for key, pos in meta['triangulars']}
+        self._positions = {(width, height): (np.array(arrays['pos_{}_{}'.format(width, height)]), pos)
+                           for width, height, pos in meta['positions']}
+        self._permutations = {key: (np.array(arrays['perm_{}'.format(key)]), pos)
+                              for key, pos in meta['permutations']}
+        self._last_permutation_length = meta.get('last_permutation_length')
@@ -0,0 +1,72 @@
+import os
+import glob
+import numpy as np
+
+# one row per search step of a Monte Carlo game
+TRACE_DTYPE = np.dtype([('game', np.int64), ('step', np.int32), ('choice', np.int8),
+                        ('e1', np.float32), ('e2', np.float32), ('e3', np.float32),
+                        ('p1', np.float32), ('p2', np.float32), ('p3', np.float32),
+                        ('found', np.bool_)])
+CHUNK_ROWS = 1 << 16 # rows buffered in memory before writing a chunk file
+CHUNK_PATTERN = 'chunk_{:06d}.npy'
+
+class TraceWriter():
+    """ Buffered writer of per-step game traces to chunked .npy files """
+
+    # rows go into a preallocated structured array and are written out as one
+    # .npy file per full buffer, so the cost per step is a single row
+    # assignment.  Each chunk can later be memory mapped on its own
+    def __init__(self, directory, chunk_rows=CHUNK_ROWS):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.buffer = np.zeros(chunk_rows, dtype=TRACE_DTYPE)
+        self.rows = 0 # rows used in the buffer
+        self.chunk_index = 0 # number of the next chunk file
+
+    def reset(self, start_chunk=0):
+        """ Drop buffered rows and any chunk files numbered start_chunk or later """
+        # used when (re)starting a study so rows written after the last
+        # checkpoint are not duplicated
+        for path in chunk_files(self.directory):
+            if chunk_number(path) >= start_chunk:
+                os.remove(path)
+        self.rows = 0
+        self.chunk_index = start_chunk
+
+    def record(self, game, step, choice, effectiveness, probabilities, found):
+        """ Add one search step to the trace """
+        self.buffer[self.rows] = (game, step, choice, *effectiveness, *probabilities, found)
+        self.rows += 1
+        if self.rows == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        """ Write any buffered rows to the next chunk file """
+        if self.rows == 0:
+            return
+        path = os.path.join(self.directory, CHUNK_PATTERN.format(self.chunk_index))
+        np.save(path, self.buffer[:self.rows])
+        self.chunk_index += 1
+        self.rows = 0
+
+def chunk_number(path):
+    """ Return the chunk number from a chunk file name """
+    return int(os.path.basename(path)[len('chunk_'):-len('.npy')])
+
+def chunk_files(directory):
+    """ Return the chunk files in a trace directory in order """
+    return sorted(glob.glob(os.path.join(directory, 'chunk_*.npy')), key=chunk_number)
+
+def iter_trace(directory, mmap=True):
+    """ Yield each chunk of a trace, memory mapped by default """
+    # with mmap the rows are only read from disk as they are used, so a trace
+    # far larger than memory can be scanned one chunk at a time
+    for path in chunk_files(directory):
+        yield np.load(path, mmap_mode='r' if mmap else None)
+
+def load_trace(directory):
+    """ Return the whole trace as one structured array in memory """
+    chunks = list(iter_trace(directory))
+    if not chunks:
+        return np.zeros(0, dtype=TRACE_DTYPE)
+    return np.concatenate(chunks)
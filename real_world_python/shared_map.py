@@ -0,0 +1,56 @@
+from multiprocessing import shared_memory
+import numpy as np
+import cv2 as cv
+
+class SharedMap():
+    """ Map image and search geometry published once in shared memory """
+
+    # the parent process decodes the map once, then copies it, the area
+    # corners and the area mask into their own shared memory blocks.  Workers only get
+    # the small picklable spec and attach to the blocks with attach_map(),
+    # so every worker sees the same pages instead of its own copy
+    def __init__(self, arrays):
+        self.blocks = []
+        self.spec = dict()
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        """ Release the shared memory, call once the workers are finished """
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+def area_mask(corners_list, shape):
+    """ Return a map sized float mask, 1.0 on the cells of any search area """
+    mask = np.zeros(shape, dtype=np.float64)
+    for corners in corners_list:
+        mask[corners[1] : corners[3], corners[0] : corners[2]] = 1.0
+    return mask
+
+def map_arrays(map_file, corners_list):
+    """ Return the decoded map, the corners of a set of search areas and their mask """
+    img = cv.imread(map_file, cv.IMREAD_COLOR)
+    if img is None:
+        raise FileNotFoundError("Could not load map file {}".format(map_file))
+    return {'img': img, 'corners': np.array(corners_list, dtype=np.int32),
+            'area_mask': area_mask(corners_list, img.shape[:2])}
+
+def attach_map(spec):
+    """ Return read-only numpy views of a published map, plus the blocks """
+    # keep the returned blocks referenced for as long as the views are used,
+    # the views point straight into them
+    arrays = dict()
+    blocks = []
+    for name, (block_name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        array = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+        blocks.append(block)
+    return arrays, blocks
@@ -1,30 +1,52 @@
+import argparse
 import nltk
-from nltk.corpus import stopwords
 import matplotlib.pyplot as plt
+from corpus_reader import words_from_text, iter_text_chunks
+from corpus_pipeline import ingest
+from ngram_profile import profile_distances
+from author_profile import vocab_chisquared, jaccard_similarity
+from stylometry_plots import PlotWriter
+from lexicon import get_lexicon
+from stylometry_bootstrap import bootstrap_test
+from vocab_overlap import VocabularyIndex, vocabulary_ids
 
 LINES = ['-', ':', '--'] # to be used for making the line graphs
 
-def main():
-    # get the texts and store in a dictionary
-    strings_by_author = dict()
-    # load each string into the dictionary as a string, use key author name
-    strings_by_author['doyle'] = text_to_string('hound.txt')
-    strings_by_author['wells'] = text_to_string('war.txt')
-    strings_by_author['unknown'] = text_to_string('lost.txt')
+def main(plotter=None, num_resamples=0):
+    # pass a PlotWriter to save the plots to files instead of showing them,
+    # and a number of resamples to add bootstrap confidence to the attribution
+    # the text file for each author, use key author name
+    files_by_author = dict()
+    files_by_author['doyle'] = 'hound.txt'
+    files_by_author['wells'] = 'war.txt'
+    files_by_author['unknown'] = 'lost.txt'
 
     # ensure things go as plan
-    print(strings_by_author['doyle'][:300])
+    print(next(iter_text_chunks(files_by_author['doyle']))[:300])
 
     # will split the .txt into words and return as a list, with key 
-    # as the author name
-    words_by_author = make_word_dict(strings_by_author)
+    # as the author name.  The files are memory mapped and read, tokenized,
+    # tagged and counted a chunk at a time by a pipeline of threads, so they
+    # are never held in memory as one big string and the stages overlap
+    pipeline = ingest(files_by_author)
+    print(pipeline.report())
+    words_by_author = pipeline.words_by_author
     # returns the length of the shorted corpus
     len_shortest_corpus = find_shortest_corpus(words_by_author)
-    word_length_test(words_by_author, len_shortest_corpus)
-    stop_words_test(words_by_author, len_shortest_corpus)
-    parts_of_speech_test(words_by_author, len_shortest_corpus)
+    word_length_test(words_by_author, len_shortest_corpus, plotter)
+    stop_words_test(words_by_author, len_shortest_corpus, plotter)
+    parts_of_speech_test(words_by_author, len_shortest_corpus, plotter,
+                         pipeline.tags_by_author)
     vocab_test(words_by_author)
     jaccard_test(words_by_author, len_shortest_corpus)
+    ngram_test(pipeline.profiles_by_author)
+    # the same vocabulary tests again, on the mergeable author profiles the
+    # pipeline built
+    profile_test(pipeline.profiles_by_author)
+    if num_resamples:
+        bootstrap_test(words_by_author, num_resamples)
+    if plotter is not None:
+        print('Plots saved to {}'.format(', '.join(plotter.close())))
 
 # loading the text and building a word dictionary
 def text_to_string(filename):
@@ -36,19 +58,9 @@ def text_to_string(filename):
 
 def make_word_dict(strings_by_author):
     """ Return a dictionary of tokenized words by corpus author """
-    # to store the words
-    words_by_author = dict()
-    # loop through all the authors
-    for author in strings_by_author:
-        # get the tokens from the nltk tekenizer
-        # this is just a list of the words used by the author, note that is also 
-        # tokenizes punctuation
-        tokens = nltk.word_tokenize(strings_by_author[author])
-        # make them all lower case.  This also filters out punctuation and hyphented words
-        # by using str.isalpha()
-        words_by_author[author] = ([token.lower() for token in tokens if token.isalpha()])
-    # return the dictionary
-    return words_by_author
+    # main() reads the files through the ingestion pipeline, this stays for
+    # callers that already hold the texts as strings
+    return {author: words_from_text(text) for author, text in strings_by_author.items()}
 
 def find_shortest_corpus(words_by_author):
     """" Return the length of the shortest corpus """
@@ -66,53 +78,64 @@ def find_shortest_corpus(words_by_author):
     #return to call
     return len_shortest_corpus
 
-def word_length_test(words_by_author, len_shortest_corpus):
+def word_length_test(words_by_author, len_shortest_corpus, plotter=None):
     """ Plot word length freq by author, truncated to shortest corpus length """
     by_author_length_freq_dict = dict()
-    #set figure to 1 as there will be multiple figures
-    plt.figure(1)
-    #turns on interactive plot mode
-    plt.ion()
-    for i, author in enumerate(words_by_author):
+    for author in words_by_author:
         # get the length of each word in the lexicon, only go up to the length of the shortest corpus
         word_lengths = [len(word) for word in words_by_author[author][:len_shortest_corpus]]
         # extract the data so that is can be plotted
         by_author_length_freq_dict[author] = nltk.FreqDist(word_lengths)
-        # limit to words that are no more than 15 chars long, using a seperate linestyle for 
-        # each author, and set the label to the author, and title the plot
-        by_author_length_freq_dict[author].plot(15, linestyle = LINES[i], label=author, title='Word Length')
-    #display legend
-    plt.legend()
-    #show the plot
-    plt.show(block=True)
+    # limit to words that are no more than 15 chars long
+    plot_freq_dists(by_author_length_freq_dict, 15, 'Word Length', 1, 'word_length', plotter)
 
-def stop_words_test(words_by_author, len_shortest_corpus):
+def stop_words_test(words_by_author, len_shortest_corpus, plotter=None):
     """ Plot stopwords freq by author, truncated to shortest corpus length """
     stopwords_by_author_freq_dist = dict()
-    #will be second figure plotted
-    plt.figure(2)
-    #get a list of stop words as a set (increases speed)
-    stop_words = set(stopwords.words('english'))
+    #the stop words are loaded once per process as a frozenset (fast lookups)
+    stop_words = get_lexicon().stop_words
     print('Number of stopwords = {}\n'.format(len(stop_words)))
-    print('Stopwords = {}\n'.format(stop_words))
-    for i, author in enumerate(words_by_author):
+    for author in words_by_author:
         #only get the word if it's a stop word
         stopwords_by_author = [word for word in words_by_author[author][:len_shortest_corpus] if word in stop_words]
         stopwords_by_author_freq_dist[author] = nltk.FreqDist(stopwords_by_author)
-        # plot the frequency
-        stopwords_by_author_freq_dist[author].plot(50, label=author, linestyle=LINES[i], title = '50 most common stopwords')
-    plt.legend()
-    plt.show(block=True)
+    plot_freq_dists(stopwords_by_author_freq_dist, 50, '50 most common stopwords', 2,
+                    'stop_words', plotter)
 
-def parts_of_speech_test(words_by_author, len_shortest_corpus):
+def parts_of_speech_test(words_by_author, len_shortest_corpus, plotter=None,
+                         tags_by_author=None):
     """" Plot author use of parts-of-speech """
     by_author_pos_freq = dict()
-    plt.figure(3)
-    for i, author in enumerate(words_by_author):
-        pos_by_author = [pos[1] for pos in  nltk.pos_tag(words_by_author[author][:len_shortest_corpus])]
+    # reuse the loaded tagger instead of having nltk find it again each call
+    lexicon = get_lexicon()
+    for author in words_by_author:
+        if tags_by_author is not None:
+            # already tagged, by the ingestion pipeline
+            pos_by_author = tags_by_author[author][:len_shortest_corpus]
+        else:
+            pos_by_author = lexicon.pos_tags(words_by_author[author][:len_shortest_corpus])
         by_author_pos_freq[author] = nltk.FreqDist(pos_by_author)
-        by_author_pos_freq[author].plot(35, label=author, linestyle=LINES[i], title = 'Parts of Speech')
+    plot_freq_dists(by_author_pos_freq, 35, 'Parts of Speech', 3, 'parts_of_speech', plotter)
+
+def plot_freq_dists(freq_by_author, num_samples, title, figure, name, plotter=None):
+    """ Plot one FreqDist per author, on screen or with a PlotWriter """
+    # with a PlotWriter all the authors are drawn on one figure and saved to a
+    # file without stopping, otherwise each FreqDist is plotted on screen and
+    # the run waits for the window to be closed
+    if plotter is not None:
+        plotter.plot(name, title, freq_by_author, num_samples)
+        return
+    #set the figure number as there will be multiple figures
+    plt.figure(figure)
+    #turns on interactive plot mode
+    plt.ion()
+    for i, author in enumerate(freq_by_author):
+        # use a seperate linestyle for each author, and set the label to the
+        # author, and title the plot
+        freq_by_author[author].plot(num_samples, linestyle=LINES[i], label=author, title=title)
+    #display legend
     plt.legend()
+    #show the plot
     plt.show(block=True)
 
 def vocab_test(words_by_author):
@@ -142,22 +165,63 @@ def vocab_test(words_by_author):
 
 def jaccard_test(words_by_author, len_shortest_corpus):
     """ Calculate Jaccard similarity of each known corpus to unknown corpus """
-    jaccard_by_author = dict()
-    #jaccard only needs unique words, use set to filter
-    unique_words_unknown = set(words_by_author['unknown'][:len_shortest_corpus])
-    # a generator expression is filter out only the known authors; saves on memory space
-    authors = (author for author in words_by_author if author != 'unknown')
-    for author in authors:
-        unique_words_author = set(words_by_author[author][:len_shortest_corpus])
-        #all the shared words are in the intersection of the unique words for each author
-        shared_words = unique_words_author.intersection(unique_words_unknown)
-        #calculate similarity
-        jaccard_sim = (float(len(shared_words))) / (len(unique_words_author)+len(unique_words_unknown)+len(shared_words))
-        jaccard_by_author[author] = jaccard_sim
+    #jaccard only needs unique words, kept as sorted arrays of word ids
+    unique_words_unknown = vocabulary_ids(words_by_author['unknown'][:len_shortest_corpus])
+    authors = [author for author in words_by_author if author != 'unknown']
+    #the shared words and similarity of every known author in one pass, the
+    #union is the unique words of both less the shared words
+    index = VocabularyIndex([vocabulary_ids(words_by_author[author][:len_shortest_corpus])
+                             for author in authors])
+    jaccard_by_author = dict(zip(authors, index.jaccard(unique_words_unknown).tolist()))
+    for author, jaccard_sim in jaccard_by_author.items():
         print(f"Jaccard similarity for {author} = {jaccard_sim}")
     #most similary author is the most likely.
     most_likely_author = max(jaccard_by_author, key = jaccard_by_author.get)
     print(f"Most likely author by similarity is {most_likely_author}")
 
+def ngram_test(profiles_by_author):
+    """ Compare hashed character and word n-gram profiles to the unknown corpus """
+    # the n-gram counts come from the AuthorProfiles the ingestion pipeline
+    # built, so the words are not hashed a second time
+    authors = [author for author in profiles_by_author if author != 'unknown']
+    profiles = [profiles_by_author[author].ngrams for author in authors]
+    unknown_profile = profiles_by_author['unknown'].ngrams
+    for kind in ('char', 'word'):
+        # distances to every known author at once, lower is more similar
+        distances = profile_distances([unknown_profile], profiles, kind)[0]
+        for author, distance in zip(authors, distances):
+            print(f"{kind.capitalize()} n-gram distance for {author} = {distance:.4f}")
+        print(f"Most likely author by {kind} n-grams is {authors[distances.argmin()]}\n")
+
+def profile_test(profiles_by_author):
+    """ Run the vocabulary and Jaccard tests on merged AuthorProfiles """
+    # works directly on the count tables, so adding a text to a reference
+    # author only costs tokenizing that text
+    unknown = profiles_by_author['unknown']
+    authors = [author for author in profiles_by_author if author != 'unknown']
+    chisquared_by_author = dict()
+    jaccard_by_author = dict()
+    for author in authors:
+        chisquared_by_author[author] = vocab_chisquared(profiles_by_author[author], unknown)
+        jaccard_by_author[author] = jaccard_similarity(profiles_by_author[author], unknown)
+        print('Profile chi-squared for {} = {:.1f}'.format(author, chisquared_by_author[author]))
+        print(f"Profile Jaccard similarity for {author} = {jaccard_by_author[author]}")
+    print('Most-likely author by profile vocabulary is {}'
+          .format(min(chisquared_by_author, key=chisquared_by_author.get)))
+    print('Most-likely author by profile similarity is {}\n'
+          .format(max(jaccard_by_author, key=jaccard_by_author.get)))
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Stylometry tests of the unknown text')
+    parser.add_argument('--plot-dir', default=None,
+                        help='save the plots to this directory instead of showing them')
+    parser.add_argument('--plot-format', default='png', help='png or svg')
+    parser.add_argument('--background', action='store_true',
+                        help='draw the saved plots in a background thread')
+    parser.add_argument('--bootstrap', type=int, default=0, metavar='N',
+                        help='also report win probabilities from N bootstrap resamples')
+    args = parser.parse_args()
+    plotter = None
+    if args.plot_dir:
+        plotter = PlotWriter(args.plot_dir, args.plot_format, args.background)
+    main(plotter, args.bootstrap)
\ No newline at end of file
@@ -0,0 +1,114 @@
+import numpy as np
+from lexicon import get_lexicon
+
+WINDOW_SIZE = 1000 # words per resampled window
+NUM_RESAMPLES = 1000
+BATCH_SIZE = 100 # resamples scored at a time, bounds the memory used
+NUM_VOCAB_WORDS = 1000 # most common words used by the chi-squared test
+
+def window_counts(ids, vocab_size, window_size=WINDOW_SIZE):
+    """ Return a (windows x vocab) matrix of word counts for each window """
+    # the remainder after the last full window is dropped
+    num_windows = len(ids) // window_size
+    ids = ids[:num_windows * window_size]
+    window = np.arange(len(ids)) // window_size
+    counts = np.bincount(window * vocab_size + ids, minlength=num_windows * vocab_size)
+    return counts.reshape(num_windows, vocab_size).astype(np.float32)
+
+def resample_weights(rng, num_resamples, num_windows, num_draws):
+    """ Return how often each window is picked in each resample """
+    # row b counts the windows drawn (with replacement) for resample b, so
+    # weights @ window_counts gives the word counts of every resample at once
+    draws = rng.integers(num_windows, size=(num_resamples, num_draws))
+    rows = np.arange(num_resamples)[:, None] * num_windows
+    weights = np.bincount((draws + rows).ravel(), minlength=num_resamples * num_windows)
+    return weights.reshape(num_resamples, num_windows).astype(np.float32)
+
+def chisquared_scores(author_counts, unknown_counts, num_words=NUM_VOCAB_WORDS):
+    """ Return the vocabulary chi-squared of each row of resampled counts """
+    # same statistic as stylometry.vocab_test(), one resample per row
+    combined = author_counts + unknown_counts
+    num_words = min(num_words, combined.shape[1])
+    top = np.argpartition(-combined, num_words - 1, axis=1)[:, :num_words]
+    combined_top = np.take_along_axis(combined, top, axis=1)
+    author_top = np.take_along_axis(author_counts, top, axis=1)
+    author_proportion = author_counts.sum(axis=1, keepdims=True) / combined.sum(axis=1, keepdims=True)
+    expected = combined_top * author_proportion
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = np.where(expected > 0, (author_top - expected)**2 / expected, 0.0)
+    return terms.sum(axis=1)
+
+def jaccard_scores(author_counts, unknown_counts):
+    """ Return the Jaccard similarity of the vocabularies in each row """
+    author_words = author_counts > 0
+    unknown_words = unknown_counts > 0
+    shared = (author_words & unknown_words).sum(axis=1)
+    union = (author_words | unknown_words).sum(axis=1)
+    return shared / np.maximum(union, 1)
+
+def bootstrap_scores(words_by_author, num_resamples=NUM_RESAMPLES,
+                     window_size=WINDOW_SIZE, seed=None):
+    """ Return bootstrapped chi-squared and Jaccard scores by author """
+    # each corpus is cut into windows of window_size words and resampled
+    # with replacement.  Every resample of every known author is scored
+    # against the same resample of the unknown corpus, so the scores can be
+    # compared resample by resample.  As in jaccard_test(), the Jaccard
+    # scores use the same number of windows for every corpus
+    rng = np.random.default_rng(seed)
+    lexicon = get_lexicon()
+    authors = [author for author in words_by_author if author != 'unknown']
+    names = authors + ['unknown']
+    ids = {author: lexicon.ids(words_by_author[author]) for author in names}
+    # number the words used by these corpora 0..vocab_size-1
+    vocab, inverse = np.unique(np.concatenate([ids[author] for author in names]),
+                               return_inverse=True)
+    split = np.cumsum([len(ids[author]) for author in names])[:-1]
+    ids = dict(zip(names, np.split(inverse, split)))
+    counts = {author: window_counts(ids[author], len(vocab), window_size) for author in names}
+    num_windows = {author: len(counts[author]) for author in names}
+    if min(num_windows.values()) == 0:
+        raise ValueError('Every corpus needs at least {} words'.format(window_size))
+    fewest_windows = min(num_windows.values())
+    chisquared = {author: [] for author in authors}
+    jaccard = {author: [] for author in authors}
+    for start in range(0, num_resamples, BATCH_SIZE):
+        batch = min(BATCH_SIZE, num_resamples - start)
+        full = dict()
+        truncated = dict()
+        for author in names:
+            weights = resample_weights(rng, batch, num_windows[author], num_windows[author])
+            full[author] = weights @ counts[author]
+            weights = resample_weights(rng, batch, num_windows[author], fewest_windows)
+            truncated[author] = weights @ counts[author]
+        for author in authors:
+            chisquared[author].append(chisquared_scores(full[author], full['unknown']))
+            jaccard[author].append(jaccard_scores(truncated[author], truncated['unknown']))
+    chisquared = {author: np.concatenate(scores) for author, scores in chisquared.items()}
+    jaccard = {author: np.concatenate(scores) for author, scores in jaccard.items()}
+    return chisquared, jaccard
+
+def summarize(scores_by_author, lower_is_better):
+    """ Return win probability and 95% interval of the scores by author """
+    authors = list(scores_by_author)
+    scores = np.stack([scores_by_author[author] for author in authors])
+    winners = scores.argmin(axis=0) if lower_is_better else scores.argmax(axis=0)
+    summary = dict()
+    for i, author in enumerate(authors):
+        low, high = np.percentile(scores[i], [2.5, 97.5])
+        summary[author] = {'win_probability': float(np.mean(winners == i)),
+                           'mean': float(scores[i].mean()), 'low': low, 'high': high}
+    return summary
+
+def bootstrap_test(words_by_author, num_resamples=NUM_RESAMPLES,
+                   window_size=WINDOW_SIZE, seed=None):
+    """ Print bootstrap win probabilities and intervals for each author """
+    chisquared, jaccard = bootstrap_scores(words_by_author, num_resamples, window_size, seed)
+    for test, scores, lower_is_better in (('Chi-squared', chisquared, True),
+                                          ('Jaccard similarity', jaccard, False)):
+        summary = summarize(scores, lower_is_better)
+        for author, result in summary.items():
+            print('{} for {} = {:.4g} (95% interval {:.4g} to {:.4g}), wins {:.1%} of {} resamples'
+                  .format(test, author, result['mean'], result['low'], result['high'],
+                          result['win_probability'], num_resamples))
+        most_likely = max(summary, key=lambda author: summary[author]['win_probability'])
+        print('Most-likely author by bootstrapped {} is {}\n'.format(test.lower(), most_likely))
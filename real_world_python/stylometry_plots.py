@@ -0,0 +1,70 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+LINES = ['-', ':', '--'] # line styles, reused if there are more authors
+
+class PlotWriter():
+    """ Render stylometry frequency plots straight to image files """
+
+    # the figures are drawn with the Agg backend and never shown on screen,
+    # so the analysis does not stop and wait for windows to be closed.  All
+    # authors go on one figure per test.  pyplot is not used, which keeps
+    # drawing safe to do in a background thread
+    def __init__(self, out_dir='plots', file_format='png', background=False):
+        self.out_dir = out_dir
+        self.file_format = file_format
+        os.makedirs(out_dir, exist_ok=True)
+        # one worker thread keeps the figures in the order they were asked for
+        self.executor = ThreadPoolExecutor(max_workers=1) if background else None
+        self.pending = [] # figures still being drawn in the background
+        self.written = [] # files already saved
+
+    def plot(self, name, title, freq_by_author, num_samples):
+        """ Plot the most common samples of each author's counts as name.<format> """
+        # the series are taken from the counts now, so the caller is free to
+        # change or drop them while the figure is drawn
+        samples = most_common_samples(freq_by_author, num_samples)
+        series = {author: [freq[sample] for sample in samples]
+                  for author, freq in freq_by_author.items()}
+        path = os.path.join(self.out_dir, '{}.{}'.format(name, self.file_format))
+        if self.executor is None:
+            self.written.append(render(path, title, samples, series))
+            return path
+        self.pending.append(self.executor.submit(render, path, title, samples, series))
+        return path
+
+    def close(self):
+        """ Wait for background plots to finish and return all the file names """
+        self.written.extend(future.result() for future in self.pending)
+        self.pending = []
+        if self.executor is not None:
+            self.executor.shutdown()
+        return self.written
+
+def most_common_samples(freq_by_author, num_samples):
+    """ Return the num_samples most common samples over all authors """
+    combined = dict()
+    for freq in freq_by_author.values():
+        for sample, count in freq.items():
+            combined[sample] = combined.get(sample, 0) + count
+    return sorted(combined, key=combined.get, reverse=True)[:num_samples]
+
+def render(path, title, samples, series):
+    """ Draw one line per author on a single figure and save it to path """
+    fig = Figure(figsize=(10, 5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    for i, (author, counts) in enumerate(series.items()):
+        ax.plot(range(len(samples)), counts, linestyle=LINES[i % len(LINES)], label=author)
+    ax.set_xticks(range(len(samples)))
+    ax.set_xticklabels([str(sample) for sample in samples], rotation=90)
+    ax.set_xlabel('Samples')
+    ax.set_ylabel('Counts')
+    ax.set_title(title)
+    ax.grid(True, color='silver')
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+    return path
@@ -0,0 +1,119 @@
+import time
+import argparse
+import numpy as np
+from lexicon import get_lexicon
+
+def vocabulary_ids(words):
+    """ Return the sorted, unique word ids of a list of words """
+    return np.unique(get_lexicon().ids(words))
+
+class VocabularyIndex():
+    """ Unique vocabularies of many reference corpora, scored in one pass """
+
+    # every reference vocabulary is a sorted array of word ids, and all of
+    # them are concatenated into one array with a parallel array saying which
+    # reference each id belongs to.  A query vocabulary is turned into a
+    # bitmap (boolean array) over the id space, so looking up every reference
+    # id in it is one fancy index, and np.bincount adds up the shared words of
+    # every reference at once.  With the shared counts the union is
+    # len(reference) + len(query) - shared, no sets are built
+    def __init__(self, vocabularies):
+        vocabularies = [np.unique(np.asarray(ids, dtype=np.int64)) for ids in vocabularies]
+        self.sizes = np.array([len(ids) for ids in vocabularies], dtype=np.int64)
+        self.ids = (np.concatenate(vocabularies) if vocabularies
+                    else np.zeros(0, dtype=np.int64))
+        self.owner = np.repeat(np.arange(len(vocabularies)), self.sizes)
+        self.id_limit = int(self.ids.max()) + 1 if len(self.ids) else 0
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def intersections(self, query_ids):
+        """ Return the number of words each reference shares with a query """
+        query_ids = np.asarray(query_ids, dtype=np.int64)
+        # ids beyond the references' largest id cannot be shared
+        query_ids = query_ids[query_ids < self.id_limit]
+        bitmap = np.zeros(self.id_limit, dtype=bool)
+        bitmap[query_ids] = True
+        return np.bincount(self.owner[bitmap[self.ids]], minlength=len(self))
+
+    def jaccard(self, query_ids):
+        """ Return the Jaccard similarity of a query to every reference """
+        query_size = len(np.unique(query_ids))
+        shared = self.intersections(query_ids)
+        union = self.sizes + query_size - shared
+        return shared / np.maximum(union, 1)
+
+    def jaccard_matrix(self, queries):
+        """ Return a (queries x references) matrix of Jaccard similarities """
+        return np.array([self.jaccard(query_ids) for query_ids in queries]).reshape(
+            len(queries), len(self))
+
+def set_jaccard(reference_ids, query_ids):
+    """ Return the Jaccard similarity from Python sets, for checking """
+    reference, query = set(reference_ids.tolist()), set(query_ids.tolist())
+    shared = len(reference & query)
+    return shared / max(len(reference | query), 1)
+
+def random_vocabularies(rng, num_authors, vocab_size, num_words):
+    """ Return unique id arrays drawn from a Zipf-like word distribution """
+    # real vocabularies share the common words and differ in the rare ones,
+    # drawing ids with probability ~ 1/rank gives the same kind of overlap
+    weights = 1.0 / np.arange(1, vocab_size + 1)
+    weights /= weights.sum()
+    return [np.unique(rng.choice(vocab_size, size=num_words, p=weights))
+            for _ in range(num_authors)]
+
+def check(num_authors=50, vocab_size=20_000, num_words=5_000, seed=None):
+    """ Compare VocabularyIndex with exact set math on random vocabularies """
+    rng = np.random.default_rng(seed)
+    vocabularies = random_vocabularies(rng, num_authors, vocab_size, num_words)
+    # include an empty vocabulary and ids past the end of the references
+    vocabularies.append(np.zeros(0, dtype=np.int64))
+    query = np.unique(np.concatenate((vocabularies[0][::2], [vocab_size + 10])))
+    index = VocabularyIndex(vocabularies)
+    expected_shared = [len(set(ids.tolist()) & set(query.tolist())) for ids in vocabularies]
+    if not np.array_equal(index.intersections(query), expected_shared):
+        raise AssertionError('intersection counts differ from set math')
+    expected = np.array([set_jaccard(ids, query) for ids in vocabularies])
+    if not np.allclose(index.jaccard(query), expected, rtol=0, atol=1e-12):
+        raise AssertionError('Jaccard similarities differ from set math')
+    return len(vocabularies)
+
+def benchmark(num_authors=1_000, vocab_size=50_000, num_words=20_000, repeats=5, seed=None):
+    """ Return seconds per query for VocabularyIndex and for Python sets """
+    rng = np.random.default_rng(seed)
+    vocabularies = random_vocabularies(rng, num_authors, vocab_size, num_words)
+    query = random_vocabularies(rng, 1, vocab_size, num_words)[0]
+    start = time.perf_counter()
+    index = VocabularyIndex(vocabularies)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(repeats):
+        index.jaccard(query)
+    index_seconds = (time.perf_counter() - start) / repeats
+    # the sets are built once, as an index would be, only the lookups are timed
+    reference_sets = [set(ids.tolist()) for ids in vocabularies]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        query_set = set(query.tolist())
+        [len(reference & query_set) / len(reference | query_set)
+         for reference in reference_sets]
+    set_seconds = (time.perf_counter() - start) / repeats
+    return build_seconds, index_seconds, set_seconds
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check and time the vectorized Jaccard engine')
+    parser.add_argument('--authors', type=int, default=1_000,
+                        help='number of reference authors in the benchmark')
+    parser.add_argument('--vocab-size', type=int, default=50_000)
+    parser.add_argument('--words', type=int, default=20_000,
+                        help='words drawn for each author before taking the unique ones')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    print('Matches set math for {} vocabularies'.format(check(seed=args.seed)))
+    build, index_query, set_query = benchmark(args.authors, args.vocab_size, args.words,
+                                              seed=args.seed)
+    print('{:,} reference authors: index built in {:.3f} s'.format(args.authors, build))
+    print('Jaccard against every author: {:.2f} ms indexed, {:.2f} ms with sets ({:.0f}x)'
+          .format(1000 * index_query, 1000 * set_query, set_query / index_query))